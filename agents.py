@@ -12,24 +12,52 @@ if ROOT_DIR not in sys.path:
 CODING_DIR = os.path.join(ROOT_DIR, "coding")
 os.makedirs(CODING_DIR, exist_ok=True)
 from helperFunctions import geocode_address, search_nearby_venues, dietary_request, get_venues_by_budget, get_venues_by_budget_and_requests, get_event_day_and_time, get_venue_opening_hours, is_open
+from venueSearch import run_structured_search, search_with_relaxation, collect_preferences, parse_venue_list, NO_VENUES_MESSAGE, AUTO_RELAX
+from venueViews import render_venue_recommendations
+from conversationState import state_for, SKIP_NAMES
+from warmExecutor import WarmCommandLineCodeExecutor
+from chatHistory import BoundedSeen
+from chatStream import finish_stream
+from preferenceRules import RULE_EXTRACTORS, is_user_answer, format_reply
+from preferenceExtraction import extract_preferences, format_extraction
+from llmCache import enable_reply_cache
+from fallbackPrefetch import FallbackPrefetcher, FALLBACK_PREFETCH
+from searchSession import SearchSession
+from functools import partial
+import json
 
 load_dotenv()
 
 if "shown" not in st.session_state:
-    st.session_state.shown = set()  
+    st.session_state.shown = BoundedSeen()
 
 def safe_markdown(sender_name: str, content: str) -> None:
     key = (sender_name, content.strip())
 
     # if duplicate message, do not show it again
-    if key in st.session_state.shown:
+    if not st.session_state.shown.add(key):
         return  
 
-    st.session_state.shown.add(key)
+    finish_stream()
     with st.chat_message(sender_name[0]):
         st.markdown(content)
 
 
+# Set EVENTPLANNER_RECOMMENDATION_BLURB=1 to stream a short LLM intro above the rendered venue list
+RECOMMENDATION_BLURB = os.environ.get("EVENTPLANNER_RECOMMENDATION_BLURB", "0") == "1"
+
+def recommendation_blurb(agent, venues: list[dict]) -> str:
+    """Two sentences on the picks, from names and ratings only rather than the full venue payload."""
+    summary = "; ".join(f"{v.get('name')} ({v.get('rating', 'unrated')}/5)" for v in venues[:5])
+    response = agent.client.create(
+        messages=[{"role": "system", "content": "You introduce venue recommendations in at most two friendly sentences. No lists, no markdown."},
+                  {"role": "user", "content": f"Venues found: {summary}"}],
+        stream=True,
+        cache=None,
+    )
+    return agent.client.extract_text_or_completion_object(response)[0].strip()
+
+
 class DisplayingAssistantAgent(AssistantAgent):
     def send(self, *args, **kwargs):
         msg = args[0] if args else kwargs.get("message")
@@ -38,7 +66,7 @@ class DisplayingAssistantAgent(AssistantAgent):
             else str(msg)
         )
         # Never display code generated or execution logs from these agents
-        if self.name in ("Code_Generator_Agent", "Code_Executor_Agent"):
+        if self.name in ("Code_Generator_Agent", "Code_Executor_Agent", "Venue_Search_Agent", "Preference_Extraction_Agent"):
             return super().send(*args, **kwargs)
         # Hide any code-fenced output (```...```), regardless of agent
         content_stripped = content.strip() if content else ""
@@ -85,7 +113,9 @@ def create_preference_agents(openai_key=None, google_key=None):
     
     llm_config = {
         "model": "gpt-4o-mini",
-        "api_key": api_key
+        "api_key": api_key,
+        # Tokens reach the chat as they arrive when a StreamlitIOStream is active
+        "stream": True,
     }
     
     preference_event_type_agent = DisplayingConversableAgent(
@@ -341,8 +371,7 @@ def create_preference_agents(openai_key=None, google_key=None):
     # code executor
     codeExecutor = DisplayingAssistantAgent (
         name="Code_Executor_Agent",
-        code_execution_config={"work_dir": CODING_DIR,
-                               "use_docker": False,},
+        code_execution_config={"executor": WarmCommandLineCodeExecutor(timeout=120, work_dir=CODING_DIR)},
         system_message="""You execute Python code and handle results.
         
         After executing code:
@@ -463,7 +492,107 @@ def create_preference_agents(openai_key=None, google_key=None):
         human_input_mode="NEVER",
     )
 
-    
+    # Deterministic search: runs the collected preferences in-process, no code generation or subprocess
+    venue_search_agent = DisplayingAssistantAgent(
+        name="Venue_Search_Agent",
+        system_message="You run the venue search for the collected preferences.",
+        llm_config=False,
+        code_execution_config=False,
+        human_input_mode="NEVER",
+    )
+
+    # Venues this conversation's searches already checked, reused when a fallback widens the radius
+    search_session = SearchSession()
+    # Searches the cheap fallbacks while the user is still reading the "no venues" offer
+    prefetcher = FallbackPrefetcher(search=partial(run_structured_search, session=search_session))
+
+    def venue_search_reply(recipient, messages=None, sender=None, config=None):
+        groupchat = getattr(sender, "groupchat", None)
+        if groupchat is not None:
+            # Same tracker speaker selection keeps, already parsed up to the latest message
+            state = state_for(groupchat)
+            prefs, fallbacks = dict(state.preferences), list(state.fallbacks)
+        else:
+            prefs, fallbacks = collect_preferences(messages or [], skip_names=SKIP_NAMES)
+        venues = prefetcher.take(prefs, fallbacks) if fallbacks else None
+        if venues is None:
+            try:
+                if AUTO_RELAX:
+                    venues, relaxations = search_with_relaxation(prefs, fallbacks, session=search_session)
+                    if relaxations:
+                        print(f"Search relaxed: {'; '.join(relaxations)}")
+                else:
+                    venues = run_structured_search(prefs, fallbacks, session=search_session)
+            except Exception as e:
+                print(f"Venue search failed: {e}")
+                venues = []
+        if not venues:
+            if FALLBACK_PREFETCH:
+                prefetcher.start(prefs, fallbacks)
+            return True, NO_VENUES_MESSAGE
+        prefetcher.cancel()
+        return True, json.dumps(venues, ensure_ascii=True, indent=2)
+
+    venue_search_agent.register_reply([ConversableAgent, None], venue_search_reply, position=0)
+
+    # One structured-output call over the first user message; only fields it misses are asked for
+    preference_extraction_agent = DisplayingAssistantAgent(
+        name="Preference_Extraction_Agent",
+        system_message="You extract every event preference stated in the user's first message.",
+        llm_config=False,
+        code_execution_config=False,
+        human_input_mode="NEVER",
+    )
+
+    def preference_extraction_reply(recipient, messages=None, sender=None, config=None):
+        user_messages = [m for m in messages or [] if is_user_answer(m, preference_proxy_agent.name)]
+        if not user_messages:
+            return True, format_extraction({})
+        try:
+            values = extract_preferences(user_messages[-1]["content"], api_key)
+        except Exception as e:
+            print(f"Preference extraction failed: {e}")
+            values = {}
+        return True, format_extraction(values)
+
+    preference_extraction_agent.register_reply([ConversableAgent, None], preference_extraction_reply, position=0)
+
+    def preference_rule_reply(recipient, messages=None, sender=None, config=None):
+        # Trivially parseable user answers become JSON without an LLM round trip
+        extractor = RULE_EXTRACTORS.get(recipient.name)
+        if extractor is None or not messages or not is_user_answer(messages[-1], preference_proxy_agent.name):
+            return False, None
+        groupchat = getattr(sender, "groupchat", None)
+        prefs = state_for(groupchat).preferences if groupchat is not None else {}
+        values = extractor(messages[-1]["content"], prefs)
+        if values is None:
+            return False, None
+        return True, format_reply(values)
+
+    def venue_recommendation_reply(recipient, messages=None, sender=None, config=None):
+        # A venue list is formatted from the data itself; the LLM only handles the fallback dialogue
+        venues = parse_venue_list(messages[-1].get("content")) if messages else None
+        if not venues:
+            return False, None
+        markdown = render_venue_recommendations(venues)
+        if RECOMMENDATION_BLURB:
+            try:
+                markdown = f"{recommendation_blurb(recipient, venues)}\n\n{markdown}"
+            except Exception as e:
+                print(f"Recommendation blurb failed: {e}")
+        return True, markdown
+
+    # Cached LLM turns first, so the rule fast path registered after them still runs ahead
+    for agent in (preference_event_type_agent, preference_event_participant_agent, preference_event_budget_agent,
+                  preference_event_time_agent, preference_event_location_agent, preference_event_request_agent,
+                  preference_event_recommendation_agent):
+        enable_reply_cache(agent, llm_config["model"])
+
+    for agent in (preference_event_type_agent, preference_event_participant_agent, preference_event_budget_agent,
+                  preference_event_time_agent, preference_event_request_agent):
+        agent.register_reply([ConversableAgent, None], preference_rule_reply, position=0)
+    preference_event_recommendation_agent.register_reply([ConversableAgent, None], venue_recommendation_reply, position=0)
+
     coordinator_agent = ConversableAgent(
         name="Coordinator_Agent",
         system_message="""
@@ -545,4 +674,5 @@ def create_preference_agents(openai_key=None, google_key=None):
     return preference_event_type_agent, preference_event_participant_agent, \
            preference_event_budget_agent, preference_event_time_agent, \
            preference_event_location_agent, preference_event_request_agent, \
-           preference_proxy_agent, codeExecutor, codeGenerator, preference_event_recommendation_agent, coordinator_agent
\ No newline at end of file
+           preference_proxy_agent, codeExecutor, codeGenerator, preference_event_recommendation_agent, coordinator_agent, \
+           venue_search_agent, preference_extraction_agent
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""Benchmark for the venue search pipeline against the synthetic Maps stand-in.
+
+    python benchmark.py --iterations 20 --latency 0.05 --output benchmark_results.json
+    python benchmark.py --compare benchmark_results.json   # exit code 1 on regression
+    python benchmark.py --skip-search --import-budget 400    # cold-start check of the search path only
+"""
+import os, sys, json, time, random, shutil, argparse, platform, tempfile, threading, subprocess, tracemalloc
+from itertools import product
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import helperFunctions
+import reviewMatcher
+from cacheStore import PersistentTTLCache
+from geocodeCache import GeocodeCache
+from mapsBackend import CountingClient, SyntheticMapsClient
+from venueIndex import VenueIndex
+from reviewIndex import ReviewIndex
+
+CITY = "Prague, CZ"
+EVENT_TIME = "next friday 20:00"
+SPECIAL_REQUEST = "vegan"
+
+# What generated search code and the executor workers import, and what that must never pull in
+SEARCH_MODULE = "helperFunctions"
+UI_MODULES = ("streamlit", "streamlit_folium", "folium", "branca")
+
+
+class CpuTimer:
+    """Accumulates per-thread CPU time spent inside wrapped functions."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+        def timed(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.seconds += time.thread_time() - start
+        return timed
+
+
+def instrument() -> dict:
+    timers = {"is_open": CpuTimer(), "review_scoring": CpuTimer()}
+    table = helperFunctions.OpeningHoursTable
+
+    class TimedOpeningHoursTable(table):
+        __init__ = timers["is_open"].wrap(table.__init__)
+        open_at = timers["is_open"].wrap(table.open_at)
+
+    helperFunctions.OpeningHoursTable = TimedOpeningHoursTable
+    helperFunctions.period_is_open = timers["is_open"].wrap(helperFunctions.period_is_open)
+    reviewMatcher.ReviewMatcher.scan = timers["review_scoring"].wrap(reviewMatcher.ReviewMatcher.scan)
+    return timers
+
+
+def fresh_state(cache_root: str, client) -> None:
+    """Cold caches and index for every search, so each run pays the full pipeline."""
+    shutil.rmtree(cache_root, ignore_errors=True)
+    os.makedirs(cache_root)
+    helperFunctions._DETAILS_CACHE = PersistentTTLCache(
+        "place_details", path=os.path.join(cache_root, "details.sqlite3"),
+        default_ttl=helperFunctions.DEFAULT_DETAILS_TTL)
+    helperFunctions._GEOCODE_CACHE = GeocodeCache(path=os.path.join(cache_root, "geocode.sqlite3"))
+    helperFunctions._VENUE_INDEX = VenueIndex(path=os.path.join(cache_root, "venues.sqlite3"))
+    helperFunctions._REVIEW_INDEX = ReviewIndex(path=os.path.join(cache_root, "reviews.sqlite3"))
+    helperFunctions._GMAPS = client
+
+
+def run_search(max_results: int, time_filter: bool, special_request: bool, rng: random.Random) -> None:
+    lat, lng = helperFunctions.geocode_address(CITY)
+    helperFunctions.get_venues_by_budget_and_requests(
+        lat=lat + rng.uniform(-0.05, 0.05), lng=lng + rng.uniform(-0.05, 0.05),
+        radius=5000, place_type="restaurant", keyword="restaurant", budget_per_person=40,
+        special_request=SPECIAL_REQUEST if special_request else None,
+        event_time=EVENT_TIME if time_filter else None,
+        max_results=max_results,
+    )
+
+
+def percentiles(samples: list[float]) -> dict:
+    arr = np.asarray(samples) * 1000
+    return {"mean": float(arr.mean()), "p50": float(np.percentile(arr, 50)),
+            "p95": float(np.percentile(arr, 95)), "p99": float(np.percentile(arr, 99))}
+
+
+def bench_scenario(args, timers, cache_root, max_results, reviews, time_filter, special_request) -> dict:
+    client = CountingClient(SyntheticMapsClient(seed=args.seed, latency=args.latency,
+                                                error_rate=args.error_rate, reviews_per_place=reviews))
+    rng = random.Random(args.seed)
+    walls, calls = [], []
+    for timer in timers.values():
+        timer.seconds = 0.0
+
+    for _ in range(args.iterations):
+        fresh_state(cache_root, client)
+        client.reset()
+        start = time.perf_counter()
+        run_search(max_results, time_filter, special_request, rng)
+        walls.append(time.perf_counter() - start)
+        calls.append(dict(client.calls))
+
+    # Separate run for memory, tracemalloc would distort the timings above
+    fresh_state(cache_root, client)
+    tracemalloc.start()
+    run_search(max_results, time_filter, special_request, rng)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    methods = sorted({m for c in calls for m in c})
+    return {
+        "params": {"max_results": max_results, "reviews_per_place": reviews,
+                   "time_filter": time_filter, "special_request": special_request},
+        "api_calls_per_search": {m: sum(c.get(m, 0) for c in calls) / len(calls) for m in methods},
+        "wall_ms": percentiles(walls),
+        "cpu_ms": {name: timer.seconds * 1000 / args.iterations for name, timer in timers.items()},
+        "peak_memory_kb": peak / 1024,
+    }
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[float, float]]:
+    """module -> (self ms, cumulative ms) from `python -X importtime` output."""
+    rows = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return rows
+
+
+def import_profile(module: str, runs: int, top: int = 10) -> dict:
+    """Cold-start cost of importing `module` in a fresh interpreter, the way every executor run pays it."""
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        rows = parse_importtime(proc.stderr)
+        samples.append((rows[module][1], rows))
+    samples.sort(key=lambda s: s[0])
+    median_rows = samples[len(samples) // 2][1]
+
+    proc = subprocess.run([sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+                          cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    loaded = set(proc.stdout.split())
+    slowest = sorted(median_rows.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    return {
+        "module": module,
+        "cumulative_ms": {"min": samples[0][0], "p50": samples[len(samples) // 2][0], "max": samples[-1][0]},
+        "slowest_self_ms": {name: self_ms for name, (self_ms, _) in slowest},
+        "modules_loaded": len(loaded),
+        "ui_modules_loaded": sorted(m for m in UI_MODULES if m in loaded),
+    }
+
+
+def check_import(profile: dict, budget_ms: float) -> list[str]:
+    problems = []
+    if profile["cumulative_ms"]["p50"] > budget_ms:
+        problems.append(f"import {profile['module']}: p50 {profile['cumulative_ms']['p50']:.1f} ms "
+                        f"over the {budget_ms:.0f} ms budget")
+    if profile["ui_modules_loaded"]:
+        problems.append(f"import {profile['module']} loads UI modules: {', '.join(profile['ui_modules_loaded'])}")
+    return problems
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of p95 wall time or API calls beyond `tolerance` (0.2 = 20%)."""
+    base = {json.dumps(s["params"], sort_keys=True): s for s in baseline["scenarios"]}
+    regressions = []
+    for scenario in current["scenarios"]:
+        key = json.dumps(scenario["params"], sort_keys=True)
+        old = base.get(key)
+        if old is None:
+            continue
+        if scenario["wall_ms"]["p95"] > old["wall_ms"]["p95"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {old['wall_ms']['p95']:.1f} -> {scenario['wall_ms']['p95']:.1f} ms")
+        new_calls = sum(scenario["api_calls_per_search"].values())
+        old_calls = sum(old["api_calls_per_search"].values())
+        if new_calls > old_calls * (1 + tolerance):
+            regressions.append(f"{key}: API calls {old_calls:.1f} -> {new_calls:.1f} per search")
+    if "import_time" in current and "import_time" in baseline:
+        old_ms = baseline["import_time"]["cumulative_ms"]["p50"]
+        new_ms = current["import_time"]["cumulative_ms"]["p50"]
+        if new_ms > old_ms * (1 + tolerance):
+            regressions.append(f"import {current['import_time']['module']}: p50 {old_ms:.1f} -> {new_ms:.1f} ms")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean simulated seconds per Maps call")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[5, 10, 20], help="max_results values")
+    parser.add_argument("--reviews", type=int, nargs="+", default=[5, 20], help="reviews per place")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=500.0,
+                        help=f"ms allowed for a cold `import {SEARCH_MODULE}`")
+    parser.add_argument("--skip-search", action="store_true", help="only run the import-time check")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    profile = import_profile(SEARCH_MODULE, args.import_runs)
+    print(f"import {SEARCH_MODULE}: p50 {profile['cumulative_ms']['p50']:.1f} ms, "
+          f"{profile['modules_loaded']} modules")
+    for name, self_ms in profile["slowest_self_ms"].items():
+        print(f"  {self_ms:8.1f} ms  {name}")
+    problems = check_import(profile, args.import_budget)
+
+    scenarios = []
+    if not args.skip_search:
+        helperFunctions.PAGE_TOKEN_DELAY = 0.0
+        timers = instrument()
+        cache_root = tempfile.mkdtemp(prefix="eventplanner-bench-")
+        try:
+            for max_results, reviews, time_filter, special_request in product(
+                    args.candidates, args.reviews, (False, True), (False, True)):
+                result = bench_scenario(args, timers, cache_root, max_results, reviews, time_filter, special_request)
+                scenarios.append(result)
+                print(f"{result['params']}: p50 {result['wall_ms']['p50']:.1f} ms, "
+                      f"p95 {result['wall_ms']['p95']:.1f} ms, "
+                      f"calls {sum(result['api_calls_per_search'].values()):.1f}")
+        finally:
+            shutil.rmtree(cache_root, ignore_errors=True)
+
+    report = {
+        "meta": {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "iterations": args.iterations, "latency": args.latency, "error_rate": args.error_rate,
+                 "seed": args.seed, "import_budget_ms": args.import_budget},
+        "import_time": profile,
+        "scenarios": scenarios,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for line in problems:
+        print(f"IMPORT BUDGET {line}")
+    regressions = compare(report, baseline, args.tolerance) if baseline is not None else []
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if problems or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
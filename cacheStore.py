@@ -0,0 +1,171 @@
+import os, json, time, sqlite3, threading
+from collections import OrderedDict
+
+CACHE_DIR = os.environ.get(
+    "EVENTPLANNER_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+MISSING = object()
+
+
+class PersistentTTLCache:
+    """In-memory LRU in front of a SQLite table, with per-entry TTLs and bounded size."""
+
+    def __init__(self,
+                 name: str,
+                 path: str = None,
+                 default_ttl: float = 86_400,
+                 max_memory_entries: int = 2_048,
+                 max_disk_entries: int = 50_000):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._writes_since_prune = 0
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "expired": 0, "writes": 0, "evictions": 0}
+        self._db = None
+        if path is None:
+            path = os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                              key TEXT PRIMARY KEY,
+                              value TEXT NOT NULL,
+                              expires_at REAL NOT NULL,
+                              accessed_at REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            db.commit()
+            self._db = db
+        except Exception as e:
+            # Read-only or missing disk: keep working with the memory layer only
+            print(f"Cache '{name}' running without disk store: {e}")
+
+    def get(self, key: str, default=MISSING):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._stats["expired"] += 1
+
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Cache '{self.name}' read failed: {e}")
+            if row is not None:
+                raw, expires_at = row
+                if expires_at > now:
+                    value = json.loads(raw)
+                    self._remember(key, value, expires_at)
+                    self._touch(key, now)
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return value
+                self._stats["expired"] += 1
+                self._delete_row(key)
+
+            self._stats["misses"] += 1
+            return default
+
+    def set(self, key: str, value, ttl: float = None) -> None:
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["writes"] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Cache '{self.name}' write failed: {e}")
+                return
+            self._writes_since_prune += 1
+            if self._writes_since_prune >= 256:
+                self.prune()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            self._delete_row(key)
+
+    def prune(self) -> None:
+        """Drop expired rows and trim the disk store to `max_disk_entries` by last access."""
+        with self._lock:
+            self._writes_since_prune = 0
+            if self._db is None:
+                return
+            try:
+                cur = self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+                removed = cur.rowcount
+                (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+                overflow = count - self.max_disk_entries
+                if overflow > 0:
+                    cur = self._db.execute(
+                        "DELETE FROM entries WHERE key IN "
+                        "(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                        (overflow,),
+                    )
+                    removed += cur.rowcount
+                self._db.commit()
+                self._stats["evictions"] += max(removed, 0)
+            except sqlite3.Error as e:
+                print(f"Cache '{self.name}' prune failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            return stats
+
+    def _remember(self, key, value, expires_at) -> None:
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _touch(self, key, now) -> None:
+        try:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def _delete_row(self, key) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._db.commit()
+        except sqlite3.Error:
+            pass
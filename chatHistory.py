@@ -0,0 +1,69 @@
+from collections import OrderedDict
+
+# Dedup sets only need to remember recent messages; older repeats are not worth hiding
+SEEN_MAX_ENTRIES = 512
+
+
+class BoundedSeen:
+    """Set of recently seen items stored by hash, forgetting the least recently seen past `max_entries`."""
+
+    def __init__(self, max_entries: int = SEEN_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._seen = OrderedDict()
+
+    def __contains__(self, item) -> bool:
+        return hash(item) in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, item) -> bool:
+        """Remember `item`; False if it was already there."""
+        key = hash(item)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return False
+        self._seen[key] = None
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        self._seen.clear()
+
+
+class ChatHistory:
+    """Append-only (role, text) display history with a hashed index of the texts it contains.
+
+    The index holds the same string objects as the entries, so it costs a set slot per message.
+    """
+
+    def __init__(self, entries=()):
+        self._entries = []
+        self._texts = set()
+        for entry in entries:
+            self.append(entry)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, index):
+        return self._entries[index]
+
+    def append(self, entry: tuple) -> None:
+        role, text = entry
+        self._entries.append((role, text))
+        self._texts.add(text)
+
+    def has_text(self, text: str) -> bool:
+        return text in self._texts
+
+    def append_new(self, role: str, text: str) -> bool:
+        """Append unless the same text is already in the history."""
+        if self.has_text(text):
+            return False
+        self.append((role, text))
+        return True
@@ -0,0 +1,48 @@
+import streamlit as st
+from autogen.events.client_events import StreamEvent
+from autogen.io import IOStream
+from autogen.io.console import IOConsole
+
+CURSOR = "▌"
+
+
+class StreamlitIOStream(IOConsole):
+    """IOStream that writes streamed LLM tokens into a live chat bubble; everything else goes to the console.
+
+    Replies that open with JSON or a code fence are routing data for other agents and are not shown.
+    The bubble is cleared by `finish()` once the complete message is rendered the usual way.
+    """
+
+    def __init__(self):
+        self._placeholder = None
+        self._text = ""
+
+    def send(self, message) -> None:
+        if isinstance(message, StreamEvent):
+            self._append(message.content.content)
+        else:
+            super().send(message)
+
+    def _append(self, chunk: str) -> None:
+        self._text += chunk or ""
+        stripped = self._text.lstrip()
+        if not stripped or stripped[0] in "{[`":
+            return
+        if self._placeholder is None:
+            self._placeholder = st.empty()
+        with self._placeholder.container():
+            with st.chat_message("assistant"):
+                st.markdown(self._text + CURSOR)
+
+    def finish(self) -> None:
+        if self._placeholder is not None:
+            self._placeholder.empty()
+        self._placeholder = None
+        self._text = ""
+
+
+def finish_stream() -> None:
+    # Called as a message is rendered for good, so its streamed preview does not linger next to it
+    stream = IOStream.get_default()
+    if isinstance(stream, StreamlitIOStream):
+        stream.finish()
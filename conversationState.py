@@ -0,0 +1,112 @@
+from venueSearch import PREFERENCE_KEYS, parse_json_objects
+
+# Preference key -> collected flag used by speaker selection
+FIELD_FLAGS = {
+    "event_type": "event_type",
+    "participants": "participants",
+    "budget_per_person": "budget",
+    "event_time": "time",
+    "location": "location",
+    "special_requests": "special_requests",
+}
+
+FALLBACK_OFFER = "Would you like me to try"
+FALLBACK_CHOICES = {"1", "2", "3", "4", "5"}
+FALLBACK_QUESTIONS = (
+    "how much larger should i search",
+    "which nearby location would you like",
+    "what's your new budget per person",
+    "what type of event would you like to try",
+)
+# A numeric reply is a fallback choice only this close after the offer
+FALLBACK_CHOICE_WINDOW = 2
+
+# Speaks once, right after the first user message, with every preference it could extract
+EXTRACTION_AGENT = "Preference_Extraction_Agent"
+
+# Search agents echo code and results, not user preferences
+SKIP_NAMES = ("Venue_Search_Agent", "Code_Executor_Agent", "Code_Generator_Agent")
+
+
+class ConversationState:
+    """What the group chat has collected so far, advanced only over messages it has not seen yet."""
+
+    def __init__(self, skip_names: tuple = SKIP_NAMES):
+        self.skip_names = skip_names
+        self.reset()
+
+    def reset(self) -> None:
+        self.cursor = 0
+        self.flags = dict.fromkeys(FIELD_FLAGS.values(), False)
+        self.flags.update(fallback_choice_made=False, waiting_for_fallback_details=False, fallback_json_ready=False,
+                          extracted=False)
+        self.preferences = {}
+        self.fallbacks = []
+        self._last_offer = None
+
+    def __getitem__(self, flag: str) -> bool:
+        return self.flags[flag]
+
+    @property
+    def all_collected(self) -> bool:
+        return all(self.flags[flag] for flag in FIELD_FLAGS.values())
+
+    def next_missing(self) -> str | None:
+        """First preference key, in asking order, that has not been collected yet."""
+        for key, flag in FIELD_FLAGS.items():
+            if not self.flags[flag]:
+                return key
+        return None
+
+    @property
+    def in_fallback(self) -> bool:
+        return any(self.flags[flag] for flag in ("fallback_choice_made", "waiting_for_fallback_details", "fallback_json_ready"))
+
+    def update(self, messages: list[dict]) -> "ConversationState":
+        if len(messages) < self.cursor:
+            # The chat was reset underneath us
+            self.reset()
+        for index in range(self.cursor, len(messages)):
+            self._consume(index, messages[index])
+        self.cursor = len(messages)
+        return self
+
+    def _consume(self, index: int, msg: dict) -> None:
+        content = msg.get("content")
+        if not isinstance(content, str):
+            return
+        if FALLBACK_OFFER in content:
+            self._last_offer = index
+        if msg.get("name") == EXTRACTION_AGENT:
+            self.flags["extracted"] = True
+
+        objects = [] if msg.get("name") in self.skip_names else parse_json_objects(content)
+        found = False
+        for obj in objects:
+            if "fallback" in obj:
+                self.fallbacks.append(obj)
+                self.flags["fallback_json_ready"] = True
+                found = True
+                continue
+            for key, value in obj.items():
+                if key in PREFERENCE_KEYS:
+                    self.preferences[key] = value
+                    self.flags[FIELD_FLAGS[key]] = True
+                    found = True
+        if found:
+            return
+
+        if content.strip() in FALLBACK_CHOICES:
+            if self._last_offer is not None and index - self._last_offer <= FALLBACK_CHOICE_WINDOW:
+                self.flags["fallback_choice_made"] = True
+        elif any(phrase in content.lower() for phrase in FALLBACK_QUESTIONS):
+            self.flags["waiting_for_fallback_details"] = True
+
+
+def state_for(groupchat) -> ConversationState:
+    """The state tracker attached to a GroupChat, brought up to date with its messages."""
+    state = getattr(groupchat, "conversation_state", None)
+    if state is None:
+        state = ConversationState()
+        groupchat.conversation_state = state
+    return state.update(groupchat.messages)
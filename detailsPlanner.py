@@ -0,0 +1,89 @@
+import os, threading
+from collections import defaultdict
+
+# Google bills a Place Details request at the highest tier among its requested fields
+FIELD_TIERS = {
+    "address_component": "basic", "adr_address": "basic", "business_status": "basic",
+    "formatted_address": "basic", "geometry": "basic", "icon": "basic", "name": "basic",
+    "photo": "basic", "place_id": "basic", "plus_code": "basic", "type": "basic",
+    "url": "basic", "utc_offset": "basic", "vicinity": "basic",
+    "wheelchair_accessible_entrance": "basic",
+    "current_opening_hours": "contact", "formatted_phone_number": "contact",
+    "international_phone_number": "contact", "opening_hours": "contact",
+    "secondary_opening_hours": "contact", "website": "contact",
+    "curbside_pickup": "atmosphere", "delivery": "atmosphere", "dine_in": "atmosphere",
+    "editorial_summary": "atmosphere", "price_level": "atmosphere", "rating": "atmosphere",
+    "reservable": "atmosphere", "reviews": "atmosphere", "serves_beer": "atmosphere",
+    "serves_breakfast": "atmosphere", "serves_brunch": "atmosphere",
+    "serves_dinner": "atmosphere", "serves_lunch": "atmosphere",
+    "serves_vegetarian_food": "atmosphere", "serves_wine": "atmosphere",
+    "takeout": "atmosphere", "user_ratings_total": "atmosphere",
+}
+TIER_ORDER = ["basic", "contact", "atmosphere"]
+
+MAX_FIELD_TIER = os.environ.get("PLACES_MAX_FIELD_TIER", "atmosphere")
+
+
+def field_tier(field: str) -> str:
+    # "geometry/location" style sub-fields are billed like their parent
+    tier = FIELD_TIERS.get(field.split("/", 1)[0])
+    if tier is None:
+        raise ValueError(f"Unknown Place Details field: {field}")
+    return tier
+
+
+class DetailsPlanner:
+    """Collects the fields each pipeline stage needs and issues one merged details request per place_id."""
+
+    def __init__(self, fetch, max_tier: str = None):
+        # fetch(place_id, fields) -> {"result": {...}}, e.g. helperFunctions.get_place_details
+        self._fetch = fetch
+        self.max_tier = max_tier or MAX_FIELD_TIER
+        if self.max_tier not in TIER_ORDER:
+            raise ValueError(f"Unknown billing tier: {self.max_tier}")
+        self._stages = {}
+        self._responses = {}
+        self._lock = threading.Lock()
+        self._place_locks = defaultdict(threading.Lock)
+
+    def require(self, stage: str, fields: list[str]) -> None:
+        for field in fields:
+            tier = field_tier(field)
+            if TIER_ORDER.index(tier) > TIER_ORDER.index(self.max_tier):
+                raise ValueError(
+                    f"Stage '{stage}' needs '{field}' ({tier} tier), above the allowed '{self.max_tier}' tier"
+                )
+        self._stages[stage] = list(fields)
+
+    @property
+    def fields(self) -> list[str]:
+        merged = []
+        for stage_fields in self._stages.values():
+            for field in stage_fields:
+                if field not in merged:
+                    merged.append(field)
+        return merged
+
+    def billing_tier(self) -> str:
+        tiers = [TIER_ORDER.index(field_tier(f)) for f in self.fields]
+        return TIER_ORDER[max(tiers)] if tiers else TIER_ORDER[0]
+
+    def fetch(self, place_id: str) -> dict:
+        with self._lock:
+            if place_id in self._responses:
+                return self._responses[place_id]
+            place_lock = self._place_locks[place_id]
+        with place_lock:
+            with self._lock:
+                if place_id in self._responses:
+                    return self._responses[place_id]
+            response = self._fetch(place_id, self.fields).get("result", {})
+            with self._lock:
+                self._responses[place_id] = response
+            return response
+
+    def slice(self, stage: str, place_id: str) -> dict:
+        """The part of the merged response that `stage` asked for, shaped like `client.place(...)`."""
+        response = self.fetch(place_id)
+        keys = {field.split("/", 1)[0] for field in self._stages[stage]}
+        return {"result": {k: v for k, v in response.items() if k in keys}}
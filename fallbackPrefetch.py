@@ -0,0 +1,75 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, CancelledError
+from mapsBackend import CallBudget, call_budget
+from venueSearch import effective_preferences, relaxation_step, run_structured_search, search_signature
+
+# Set EVENTPLANNER_FALLBACK_PREFETCH=0 to only search once the user has picked a fallback
+FALLBACK_PREFETCH = os.environ.get("EVENTPLANNER_FALLBACK_PREFETCH", "1") != "0"
+# Maps calls each speculative search may spend before it is abandoned
+PREFETCH_MAX_CALLS = int(os.environ.get("FALLBACK_PREFETCH_MAX_CALLS", 40))
+# Seconds to wait for a prefetch still running when the user's choice arrives
+PREFETCH_WAIT = float(os.environ.get("FALLBACK_PREFETCH_WAIT", 30))
+
+
+def cheap_fallbacks(prefs: dict) -> list[dict]:
+    """The fallbacks that need no further user input beyond picking them."""
+    steps = (relaxation_step(prefs, rung) for rung in ("expand_radius", "increase_budget", "remove_requests"))
+    return [step[0] for step in steps if step is not None]
+
+
+class FallbackPrefetcher:
+    """Runs the cheap fallback searches in the background after an empty result.
+
+    Each search has its own Maps call budget; one that runs out is discarded rather than served
+    half-checked. `take` hands over the result for the fallback the user picked, `cancel` stops the rest.
+    """
+
+    def __init__(self, max_calls: int = PREFETCH_MAX_CALLS, wait: float = PREFETCH_WAIT, search=run_structured_search):
+        self.max_calls = max_calls
+        self.wait = wait
+        self.search = search
+        self._pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="fallback-prefetch")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, prefs: dict, fallbacks: list[dict] = ()) -> int:
+        self.cancel()
+        current = effective_preferences(prefs, fallbacks)
+        jobs = {}
+        for option in cheap_fallbacks(current):
+            chain = [*fallbacks, option]
+            budget = CallBudget(self.max_calls)
+            # Plain submit: the speculative search must not inherit the UI's progress hook
+            future = self._pool.submit(self._run, prefs, chain, budget)
+            jobs[search_signature(effective_preferences(prefs, chain))] = (future, budget)
+        with self._lock:
+            self._jobs = jobs
+        return len(jobs)
+
+    def _run(self, prefs: dict, chain: list[dict], budget: CallBudget) -> list[dict] | None:
+        with call_budget(budget):
+            venues = self.search(prefs, chain)
+        return None if budget.exhausted or budget.cancelled.is_set() else venues
+
+    def take(self, prefs: dict, fallbacks: list[dict] = ()) -> list[dict] | None:
+        """Prefetched venues for this search, or None if it was not prefetched or did not finish cleanly."""
+        signature = search_signature(effective_preferences(prefs, fallbacks))
+        with self._lock:
+            job = self._jobs.pop(signature, None)
+        if job is None:
+            return None
+        future, budget = job
+        try:
+            return future.result(timeout=self.wait)
+        except (TimeoutError, CancelledError):
+            budget.cancel()
+        except Exception as e:
+            print(f"Fallback prefetch failed: {e}")
+        return None
+
+    def cancel(self) -> None:
+        with self._lock:
+            jobs, self._jobs = self._jobs, {}
+        for future, budget in jobs.values():
+            budget.cancel()
+            future.cancel()
@@ -0,0 +1,82 @@
+import os, re, unicodedata
+from cacheStore import MISSING, PersistentTTLCache
+
+GEOCODE_TTL = float(os.environ.get("GEOCODE_CACHE_TTL", 30 * 86_400))
+# "Address not found" is remembered for a shorter time in case it was a transient miss
+GEOCODE_NEGATIVE_TTL = float(os.environ.get("GEOCODE_NEGATIVE_TTL", 3_600))
+
+_PUNCTUATION = re.compile(r"[^\w\s,-]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_address(address: str) -> tuple[str, str]:
+    """Split a free-form location into a normalized place part and an optional trailing region hint.
+
+    "  Prague, CZ " -> ("prague", "cz"); "prague" -> ("prague", "")
+    """
+    text = unicodedata.normalize("NFKC", address or "").casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    parts = [_SPACES.sub(" ", p).strip(" -") for p in text.split(",")]
+    parts = [p for p in parts if p]
+    if not parts:
+        return "", ""
+    if len(parts) == 1:
+        return parts[0], ""
+    return ", ".join(parts[:-1]), parts[-1]
+
+
+def _key(place: str, hint: str) -> str:
+    return f"{place}|{hint}"
+
+
+class GeocodeCache:
+    """Geocode results keyed by normalized address, with aliases for the resolved country and formatted address."""
+
+    def __init__(self, ttl: float = GEOCODE_TTL, negative_ttl: float = GEOCODE_NEGATIVE_TTL, path: str = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._store = PersistentTTLCache("geocode", path=path, default_ttl=ttl)
+
+    def get(self, address: str):
+        """Cached location dict, None for a cached "not found", or MISSING."""
+        place, hint = normalize_address(address)
+        return self._store.get(_key(place, hint))
+
+    def set(self, address: str, location: dict | None) -> None:
+        place, hint = normalize_address(address)
+        if location is None:
+            self._store.set(_key(place, hint), None, ttl=self.negative_ttl)
+            return
+
+        self._store.set(_key(place, hint), location, ttl=self.ttl)
+        country_names = {n for n in (location.get("country_code"), location.get("country")) if n}
+        for name in country_names:
+            self._store.set(_key(place, name), location, ttl=self.ttl)
+        # The bare name only inherits the result if the hint was a country, not e.g. a US state,
+        # and never replaces what an unqualified lookup of the same name already resolved to
+        if not hint or (hint in country_names and self._store.get(_key(place, "")) is MISSING):
+            self._store.set(_key(place, ""), location, ttl=self.ttl)
+        formatted = location.get("formatted_address")
+        if formatted:
+            self._store.set(_key(*normalize_address(formatted)), location, ttl=self.ttl)
+
+    def stats(self) -> dict:
+        return self._store.stats()
+
+
+def location_from_geocode(result: dict) -> dict:
+    geometry = result.get("geometry", {})
+    location = {
+        "lat": geometry["location"]["lat"],
+        "lng": geometry["location"]["lng"],
+        "viewport": geometry.get("viewport"),
+        "formatted_address": result.get("formatted_address"),
+        "country_code": None,
+        "country": None,
+    }
+    for component in result.get("address_components", []):
+        if "country" in component.get("types", []):
+            location["country_code"] = component.get("short_name", "").casefold() or None
+            location["country"] = component.get("long_name", "").casefold() or None
+            break
+    return location
@@ -1,7 +1,19 @@
-import os, googlemaps, parsedatetime, datetime, folium
-import streamlit as st
-from streamlit_folium import folium_static
-from collections import defaultdict
+import os, sys, googlemaps, parsedatetime, datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from itertools import islice
+from time import sleep
+from cacheStore import PersistentTTLCache, MISSING
+from detailsPlanner import DetailsPlanner
+from geocodeCache import GeocodeCache, location_from_geocode
+from openingHours import OpeningHoursTable, period_is_open, week_minute
+from reviewMatcher import get_matcher
+from reviewIndex import ReviewIndex
+from venueIndex import VenueIndex, haversine_m
+from mapsBackend import create_client, budget_intact
+from searchSession import SearchSession
+from venueRanking import rank_venues
 
 DIETARY_KEYWORDS = {
     "vegetarian": ["vegetarian", "veggie", "plant-based"],
@@ -18,6 +30,27 @@ PRICEABLE_TYPES = {
     "night_club", "bakery"
 }
 
+# Seconds each Place Details field stays fresh; hours change rarely, reviews often
+DETAILS_FIELD_TTLS = {
+    "name": 30 * 86_400,
+    "opening_hours": 7 * 86_400,
+    "reviews": 86_400,
+}
+DEFAULT_DETAILS_TTL = 86_400
+
+# Nearby Search paging: Google serves at most 3 pages and needs a moment before a page token works
+MAX_PAGES = 3
+PAGE_SIZE = 20
+PAGE_TOKEN_DELAY = 2.0
+PAGE_TOKEN_RETRIES = 3
+
+# At most this many uncovered grid cells are searched one by one; more means one full search
+MAX_CELL_QUERIES = 2
+
+# Place Details fan-out: worker threads and overall wall-clock budget in seconds
+DETAILS_MAX_WORKERS = 8
+DETAILS_DEADLINE = 15.0
+
 WEEKDAY_TO_NUM = {
     "Sunday": 0,
     "Monday": 1,
@@ -28,7 +61,29 @@ WEEKDAY_TO_NUM = {
     "Saturday": 6,
 }
 
-# --- Lazy Google Maps client ---
+# --- Progress reporting: the UI installs a callback for the searches it runs ---
+_PROGRESS = ContextVar("search_progress", default=None)
+
+@contextmanager
+def search_progress(callback):
+    """Call `callback(message)` with pipeline steps ("Geocoding ...") for searches inside this block."""
+    token = _PROGRESS.set(callback)
+    try:
+        yield
+    finally:
+        _PROGRESS.reset(token)
+
+
+def report_progress(message: str) -> None:
+    callback = _PROGRESS.get()
+    if callback is not None:
+        try:
+            callback(message)
+        except Exception as e:
+            print(f"Progress callback failed: {e}")
+
+
+# --- Lazy Google Maps client (backend chosen by MAPS_BACKEND, see mapsBackend) ---
 _GMAPS = None
 def get_gmaps():
     global _GMAPS
@@ -37,9 +92,9 @@ def get_gmaps():
 
         # Prefer Streamlit session (when inside the Streamlit app)
         try:
-            import streamlit as st
-            # Only if Streamlit is actually running
-            if st.runtime.exists():
+            # Only if Streamlit is already loaded and actually running; never import it from here
+            st = sys.modules.get("streamlit")
+            if st is not None and st.runtime.exists():
                 key = st.session_state.get("google_api_key")
         except Exception:
             pass
@@ -48,81 +103,357 @@ def get_gmaps():
         if not key:
             key = os.environ.get("RUNTIME_GOOGLEMAPS_API_KEY")  # set by parent before exec
 
-
-        if not key:
-            raise ValueError("GOOGLEMAPS_API_KEY is not set. Provide it in the UI.")
-        _GMAPS = googlemaps.Client(key=key)
+        _GMAPS = create_client(key)
     return _GMAPS
 
 
+# --- Place Details cache ---
+_DETAILS_CACHE = None
+def get_details_cache() -> PersistentTTLCache:
+    global _DETAILS_CACHE
+    if _DETAILS_CACHE is None:
+        _DETAILS_CACHE = PersistentTTLCache("place_details", default_ttl=DEFAULT_DETAILS_TTL)
+    return _DETAILS_CACHE
+
+
+def get_place_details(place_id: str, fields: list[str]) -> dict:
+    """Same shape as `client.place(...)`, but each field is cached per place_id and only missing fields are fetched."""
+    cache = get_details_cache()
+    result = {}
+    missing = []
+    for field in fields:
+        value = cache.get(f"{place_id}:{field}")
+        if value is MISSING:
+            missing.append(field)
+        elif value is not None:
+            result[field] = value
+
+    if missing:
+        details = get_gmaps().place(place_id=place_id, fields=missing)
+        fetched = details.get("result", {})
+        for field in missing:
+            value = fetched.get(field)
+            # Absent fields are cached too, so venues without hours are not re-fetched
+            cache.set(f"{place_id}:{field}", value, ttl=DETAILS_FIELD_TTLS.get(field, DEFAULT_DETAILS_TTL))
+            if value is not None:
+                result[field] = value
+    return {"result": result}
+
+
+# --- Geocode cache, shared by every session in this process and persisted to disk ---
+_GEOCODE_CACHE = None
+def get_geocode_cache() -> GeocodeCache:
+    global _GEOCODE_CACHE
+    if _GEOCODE_CACHE is None:
+        _GEOCODE_CACHE = GeocodeCache()
+    return _GEOCODE_CACHE
+
+
+# --- Local spatial index of venues seen in earlier searches ---
+_VENUE_INDEX = None
+def get_venue_index() -> VenueIndex | None:
+    global _VENUE_INDEX
+    if _VENUE_INDEX is None:
+        try:
+            _VENUE_INDEX = VenueIndex()
+        except Exception as e:
+            print(f"Venue index unavailable, searching live only: {e}")
+            _VENUE_INDEX = False
+    return _VENUE_INDEX or None
+
+
+# --- Inverted index of review text, so known venues answer special requests without a reviews fetch ---
+_REVIEW_INDEX = None
+def get_review_index() -> ReviewIndex | None:
+    global _REVIEW_INDEX
+    if _REVIEW_INDEX is None:
+        try:
+            _REVIEW_INDEX = ReviewIndex()
+        except Exception as e:
+            print(f"Review index unavailable, fetching reviews for every venue: {e}")
+            _REVIEW_INDEX = False
+    return _REVIEW_INDEX or None
+
+
+def geocode_location(address: str) -> dict:
+    """lat/lng, viewport, formatted address and country for `address`, served from the geocode cache when possible."""
+    cache = get_geocode_cache()
+    location = cache.get(address)
+    if location is MISSING:
+        report_progress(f"Geocoding {address}…")
+        client = get_gmaps()
+        geocode_result = client.geocode(address)
+        location = location_from_geocode(geocode_result[0]) if geocode_result else None
+        cache.set(address, location)
+    if location is None:
+        raise ValueError("Address not found.")
+    return location
+
+
 def geocode_address(address: str) -> tuple:
+    location = geocode_location(address)
+    return [location["lat"], location["lng"]]
+
+
+def _next_page(client, page_token: str) -> dict | None:
+    # A fresh next_page_token is only accepted after a short delay
+    for _ in range(PAGE_TOKEN_RETRIES):
+        sleep(PAGE_TOKEN_DELAY)
+        try:
+            return client.places_nearby(page_token=page_token)
+        except googlemaps.exceptions.ApiError as e:
+            if e.status != "INVALID_REQUEST":
+                raise
+    print("Gave up waiting for the next results page")
+    return None
+
+
+def iter_places_nearby(on_page=None, on_complete=None, **params):
+    """Yield `places_nearby` results lazily; the next page is only requested once the consumer gets there.
+
+    `on_page(results)` is called with each page as it arrives, `on_complete()` once the last page
+    (one without a next_page_token) has arrived, i.e. the search was not truncated.
+    """
     client = get_gmaps()
-    geocode_result = client.geocode(address)
-    if geocode_result:
-        loc = geocode_result[0]["geometry"]["location"]
-        return [loc["lat"], loc["lng"]]
-    else:
-        raise ValueError("Address not found.")
+    response = client.places_nearby(**params)
+    pages = 1
+    while True:
+        results = response.get("results", [])
+        page_token = response.get("next_page_token")
+        if on_page:
+            on_page(results)
+        # A full last page at the page limit means Google stopped, not that the area ran out
+        truncated = pages >= MAX_PAGES and len(results) >= PAGE_SIZE
+        if not page_token and not truncated and on_complete:
+            on_complete()
+        yield from results
+        if not page_token or pages >= MAX_PAGES:
+            return
+        response = _next_page(client, page_token)
+        if response is None:
+            return
+        pages += 1
 
 
 def search_nearby_venues(lat: float, lng: float, radius: int = 5000, place_type: str = None, keyword: str = None, max_results: int = 5) -> list:
-    client = get_gmaps()
-    places_result = client.places_nearby(
+    venues = iter_places_nearby(
         location=(lat, lng),
         radius=radius,
         type=place_type,
         keyword=keyword,
         min_price=0,
     )
-    results = places_result.get('results', [])
-    return results[:max_results]  
+    return list(islice(venues, max_results))
 
 
 def dietary_request(texts: list[str]) -> dict[str, int]:
-    tag_hits = defaultdict(int)
-    for text in texts:
-        lower = text.lower()
-        for tag, keywords in DIETARY_KEYWORDS.items():
-            if any(kw in lower for kw in keywords):
-                tag_hits[tag] += 1
-    return dict(tag_hits)
+    _, tag_hits = get_matcher(None, DIETARY_KEYWORDS).scan(texts)
+    return tag_hits
 
 
-def get_venues_by_budget(lat: float,
-                         lng: float,
-                         radius: int = 10_000,
-                         place_type: str = None,
-                         keyword: str = None,
-                         budget_per_person: float = 0.0,
-                         max_results: int = 10,
-                         event_day: str = None) -> list[dict]:
-
+def budget_to_price_level(budget_per_person: float) -> int:
     if budget_per_person <= 0:
-        level = 0
+        return 0
     elif budget_per_person <= 10:
-        level = 1
+        return 1
     elif budget_per_person <= 30:
-        level = 2
+        return 2
     elif budget_per_person <= 60:
-        level = 3
-    else:
-        level = 4
+        return 3
+    return 4
+
+
+# Highest budget per person that still maps to each price level
+PRICE_LEVEL_MAX_BUDGET = [0, 10, 30, 60, 1000]
+
+def next_budget_tier(budget_per_person: float) -> float | None:
+    """Budget per person that unlocks the next price level, or None at the top."""
+    level = budget_to_price_level(budget_per_person)
+    if level >= len(PRICE_LEVEL_MAX_BUDGET) - 1:
+        return None
+    return PRICE_LEVEL_MAX_BUDGET[level + 1]
 
+
+def iter_venues_by_budget(lat: float,
+                          lng: float,
+                          radius: int = 10_000,
+                          place_type: str = None,
+                          keyword: str = None,
+                          budget_per_person: float = 0.0):
     params = {
         "location": (lat, lng),
         "radius": radius,
         "type": place_type,
         "keyword": keyword,
-        "max_price": level,
+        "max_price": budget_to_price_level(budget_per_person),
     }
     params = {k: v for k, v in params.items() if v is not None}
     if place_type not in PRICEABLE_TYPES:
-        params.pop("max_price", None)  
+        params.pop("max_price", None)
+
+    index = get_venue_index()
+    if index is None:
+        return iter_places_nearby(**params)
+    return _iter_indexed_venues(index, params)
+
+
+def _iter_indexed_venues(index: VenueIndex, params: dict):
+    """Serve covered cells from the local venue index and fetch the few missing ones lazily, page by page.
+
+    When too much of the circle is unknown, one live search runs instead. Coverage is only recorded
+    for searches whose results were read to the last page.
+    """
+    lat, lng = params["location"]
+    radius = params["radius"]
+    query = dict(place_type=params.get("type"), keyword=params.get("keyword"))
+    max_price = params.get("max_price")
+    cells, missing = index.missing_cells(lat, lng, radius, **query, max_price=max_price)
+    on_page = lambda results: index.add(results, **query)
+
+    if missing and (len(missing) > MAX_CELL_QUERIES or len(missing) == len(cells)):
+        on_complete = lambda: index.cover(lat, lng, radius, **query, max_price=max_price)
+        yield from iter_places_nearby(on_page=on_page, on_complete=on_complete, **params)
+        return
 
-    client = get_gmaps()
-    response = client.places_nearby(**params)
-    results = response.get("results", [])
-    return results[:max_results]  
+    seen = set()
+    for v in index.venues_in(lat, lng, radius, **query, max_price=max_price):
+        seen.add(v.get("place_id"))
+        yield v
+
+    # Only reached when the consumer wants more than the covered cells hold
+    for cell in missing:
+        center, cell_radius = index.cell_center(cell), index.cell_radius(cell)
+        on_complete = lambda center=center, cell_radius=cell_radius: index.cover(*center, cell_radius, **query,
+                                                                                 max_price=max_price)
+        for v in iter_places_nearby(on_page=on_page, on_complete=on_complete,
+                                    **{**params, "location": center, "radius": cell_radius}):
+            loc = v.get("geometry", {}).get("location")
+            if v.get("place_id") in seen or not loc or haversine_m(lat, lng, loc["lat"], loc["lng"]) > radius:
+                continue
+            seen.add(v.get("place_id"))
+            yield v
+
+
+def get_venues_by_budget(lat: float,
+                         lng: float,
+                         radius: int = 10_000,
+                         place_type: str = None,
+                         keyword: str = None,
+                         budget_per_person: float = 0.0,
+                         max_results: int = 10,
+                         event_day: str = None) -> list[dict]:
+    venues = iter_venues_by_budget(lat, lng, radius, place_type, keyword, budget_per_person)
+    return list(islice(venues, max_results))
+
+
+def _venue_periods(v: dict, planner: DetailsPlanner) -> list[dict]:
+    try:
+        details = planner.slice("opening_hours", v["place_id"])
+        return details["result"].get("opening_hours", {}).get("periods", [])
+    except Exception as e:
+        print(f"Error checking opening hours for venue: {e}")
+        return []
+
+
+def _score_venue_reviews(v: dict, req_lower: str, planner: DetailsPlanner, index: ReviewIndex = None) -> dict:
+    """The review fields for `v`; returned rather than written, since the venue dict belongs to the caller."""
+    scored = {"relevance_score": 1}
+    try:
+        details = planner.slice("reviews", v["place_id"])
+        review_texts = [r.get("text", "") for r in details["result"].get("reviews", [])]
+        match_count, tag_hits = get_matcher(req_lower, DIETARY_KEYWORDS).scan(review_texts)
+        if match_count > 0:
+            scored["relevance_score"] += match_count
+            scored["request_matches"] = match_count
+        if tag_hits:
+            scored["dietary_matches"] = tag_hits
+        if index is not None:
+            index.add(v["place_id"], review_texts, tag_hits)
+    except Exception as e:
+        print(f"Error checking reviews for venue {v.get('name', 'Unknown')}: {e}")
+    return scored
+
+
+def _enrich_venue(v: dict, check_hours: bool, req_lower: str, planner: DetailsPlanner,
+                  index: ReviewIndex = None) -> tuple[list[dict], dict]:
+    periods = _venue_periods(v, planner) if check_hours else []
+    scored = _score_venue_reviews(v, req_lower, planner, index) if req_lower else {}
+    return periods, scored
+
+
+def _apply_review_index(venues: list[dict], req_lower: str, index: ReviewIndex, indexed: set[str]) -> None:
+    """Request matches and dietary tags of the `indexed` venues, which skipped the reviews fetch, from the index."""
+    matches = index.match(sorted(indexed), req_lower)
+    for v in venues:
+        if v.get("place_id") not in indexed:
+            continue
+        match_count = matches[v["place_id"]]
+        v.pop("request_matches", None)
+        if match_count > 0:
+            v["request_matches"] = match_count
+        tags = index.tags(v["place_id"])
+        if tags:
+            v["dietary_matches"] = tags
+        v["relevance_score"] = 1 + match_count
+
+
+def enrich_venues(venues: list[dict],
+                  day: int = None,
+                  time: str = None,
+                  req_lower: str = None,
+                  max_workers: int = DETAILS_MAX_WORKERS,
+                  deadline: float = DETAILS_DEADLINE) -> list[dict]:
+    """Opening-hours filter and review scoring for all venues on a bounded thread pool.
+
+    Order is preserved. A venue whose lookup fails or misses the deadline is kept, as before.
+    Both stages share one merged details request per venue; venues already in the review index
+    skip the reviews fetch and are scored from the index.
+    """
+    if not venues:
+        return []
+    planner = DetailsPlanner(get_place_details)
+    hours_planner = DetailsPlanner(get_place_details)
+    if day is not None:
+        planner.require("opening_hours", ["opening_hours"])
+        hours_planner.require("opening_hours", ["opening_hours"])
+    if req_lower:
+        planner.require("reviews", ["reviews"])
+    check_hours = day is not None
+    index = get_review_index() if req_lower else None
+    indexed = index.known([v.get("place_id") for v in venues]) if index is not None else set()
+    steps = [step for step, wanted in (("opening hours", check_hours), ("reviews", req_lower)) if wanted]
+    report_progress(f"Checking {' and '.join(steps)} for {len(venues)} venues…")
+    pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(venues))))
+    # Each task runs in a copy of the caller's context, so call budgets and progress hooks follow it
+    futures = [
+        pool.submit(copy_context().run, _enrich_venue, v, check_hours, None, hours_planner)
+        if v.get("place_id") in indexed else
+        pool.submit(copy_context().run, _enrich_venue, v, check_hours, req_lower, planner, index)
+        for v in venues
+    ]
+    done, _ = wait(futures, timeout=deadline)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    # Workers still running past the deadline only return results; venues are updated here, in this thread
+    periods_list = []
+    for v, future in zip(venues, futures):
+        if future not in done or future.cancelled():
+            print(f"Details lookup for venue {v.get('name', 'Unknown')} missed the {deadline}s deadline")
+            if req_lower:
+                v.setdefault("relevance_score", 1)
+            periods_list.append([])
+        else:
+            periods, scored = future.result()
+            v.update(scored)
+            periods_list.append(periods)
+    if indexed:
+        _apply_review_index(venues, req_lower, index, indexed)
+
+    if not check_hours:
+        return list(venues)
+    # Venues without known hours (missing, failed or timed out) are kept
+    open_now = OpeningHoursTable(periods_list).open_at(week_minute(day, time))[:, 0]
+    return [v for v, keep in zip(venues, open_now) if keep]
 
 
 def get_venues_by_budget_and_requests(lat: float,
@@ -133,7 +464,31 @@ def get_venues_by_budget_and_requests(lat: float,
                                      budget_per_person: float = 0.0,
                                      special_request: str = None,
                                      event_time: str = None,
-                                     max_results: int = 5) -> list[dict]:
+                                     max_results: int = 5,
+                                     max_workers: int = DETAILS_MAX_WORKERS,
+                                     deadline: float = DETAILS_DEADLINE) -> list[dict]:
+    # Registered as an LLM tool, so its signature stays free of non-JSON parameters
+    return search_venues(lat, lng, radius, place_type, keyword, budget_per_person, special_request,
+                         event_time, max_results, max_workers, deadline)
+
+
+def search_venues(lat: float,
+                  lng: float,
+                  radius: int = 10_000,
+                  place_type: str = None,
+                  keyword: str = None,
+                  budget_per_person: float = 0.0,
+                  special_request: str = None,
+                  event_time: str = None,
+                  max_results: int = 5,
+                  max_workers: int = DETAILS_MAX_WORKERS,
+                  deadline: float = DETAILS_DEADLINE,
+                  session: SearchSession = None) -> list[dict]:
+    """Venues open at `event_time` and matching `special_request`, best first.
+
+    With a `session`, venues an earlier search with the same filters already checked are not
+    looked up again: a wider radius only enriches the place_ids the smaller one did not return.
+    """
     day = None
     time = None
     if event_time:
@@ -145,57 +500,60 @@ def get_venues_by_budget_and_requests(lat: float,
             event_time = None
 
     combined_keyword = " ".join(filter(None, [keyword, special_request]))
-    venues = get_venues_by_budget(
+    report_progress(f"Searching for {(place_type or 'event').replace('_', ' ')} venues nearby…")
+    candidates = iter_venues_by_budget(
         lat=lat, lng=lng,
         radius=radius,
         place_type=place_type,
         keyword=combined_keyword or None,
         budget_per_person=budget_per_person,
-        max_results=max_results * 2  
     )
 
-    client = get_gmaps()
-
-    if event_time and day is not None and time is not None:
-        still_open = []
-        for v in venues:
-            try:
-                details = client.place(place_id=v["place_id"], fields=["opening_hours"])
-                periods = details["result"].get("opening_hours", {}).get("periods", [])
-                if periods and is_open(periods, day, time):
-                    still_open.append(v)
-                elif not periods:
-                    still_open.append(v)
-            except Exception as e:
-                print(f"Error checking opening hours for venue: {e}")
-                still_open.append(v)
-        venues = still_open
-
-    if special_request and len(special_request.strip()) > 0:
-        try:
-            req_lower = special_request.lower()
-            enhanced_venues = []
-            for v in venues:
-                venue_score = 1
-                try:
-                    details = client.place(place_id=v["place_id"], fields=["reviews"])
-                    reviews = details["result"].get("reviews", [])
-                    if reviews:
-                        review_texts = [r.get("text", "").lower() for r in reviews]
-                        match_count = sum(review.count(req_lower) for review in review_texts)
-                        if match_count > 0:
-                            venue_score += match_count
-                            v["request_matches"] = match_count
-                    v["relevance_score"] = venue_score
-                    enhanced_venues.append(v)
-                except Exception as e:
-                    print(f"Error checking reviews for venue {v.get('name', 'Unknown')}: {e}")
-                    v["relevance_score"] = venue_score
-                    enhanced_venues.append(v)
-            venues = sorted(enhanced_venues, key=lambda x: x.get("relevance_score", 0), reverse=True)
-        except Exception as e:
-            print(f"Error in special request filtering: {e}")
-    return venues[:max_results]
+    check_hours = bool(event_time and day is not None and time is not None)
+    req_lower = special_request.lower() if special_request and special_request.strip() else None
+    working = None
+    venues = []
+    if session is not None:
+        key = (round(lat, 6), round(lng, 6), place_type, combined_keyword,
+               budget_to_price_level(budget_per_person), req_lower, day if check_hours else None, time if check_hours else None)
+        working = session.working_set(key)
+    # Enrich a batch at a time and only pull further pages while too few venues survive
+    while len(venues) < max_results:
+        # Unfiltered venues all survive, so take only what is missing; filtered batches stay within one page
+        size = min(max_results * 2, PAGE_SIZE) if check_hours or req_lower else max_results - len(venues)
+        batch = pulled = list(islice(candidates, size))
+        if not batch:
+            break
+        in_flight = []
+        if working is not None:
+            batch, in_flight = working.claim_new(batch)
+        judged = batch
+        if batch and (check_hours or req_lower):
+            batch = enrich_venues(batch, day if check_hours else None, time if check_hours else None,
+                                  req_lower, max_workers=max_workers, deadline=deadline)
+        if working is not None:
+            if budget_intact():
+                working.record(judged, batch)
+            else:
+                working.release(judged)
+        if in_flight:
+            # Judged, or being judged, by another search with the same filters: use its verdicts or judge them here
+            have = {v.get("place_id") for v in venues}
+            in_flight = [v for v in in_flight if v["place_id"] not in have]
+            kept, unsettled = working.await_verdicts(in_flight, deadline)
+            if unsettled and (check_hours or req_lower):
+                unsettled = enrich_venues(unsettled, day if check_hours else None, time if check_hours else None,
+                                          req_lower, max_workers=max_workers, deadline=deadline)
+            batch = batch + kept + unsettled
+            # Back in the order they were found, so a widened search ranks exactly like a fresh one
+            position = {v.get("place_id"): i for i, v in enumerate(pulled)}
+            batch.sort(key=lambda v: position.get(v.get("place_id"), len(pulled)))
+        venues.extend(batch)
+    candidates.close()
+
+    # The top tier's budget stands for "no budget", which should not favour any price level
+    price_level = None if budget_per_person >= PRICE_LEVEL_MAX_BUDGET[-1] else budget_to_price_level(budget_per_person)
+    return rank_venues(venues, lat, lng, radius, price_level, k=max_results)
 
 
 def get_event_day_and_time(event_date: str) -> tuple[str, str]:
@@ -220,11 +578,12 @@ def get_event_day_and_time(event_date: str) -> tuple[str, str]:
 
 
 def get_venue_opening_hours(results: list[dict]) -> list[tuple[str, dict[str, str]]]:
-    client = get_gmaps()
+    planner = DetailsPlanner(get_place_details)
+    planner.require("schedule", ["name", "opening_hours"])
     schedules = []
     for place in results:
         raw_pid = place.get("place_id")
-        raw_details = client.place(place_id=raw_pid, fields=["name", "opening_hours"])
+        raw_details = planner.slice("schedule", raw_pid)
         res = raw_details.get("result", {})
         name = res.get("name", raw_pid)
         raw = res.get("opening_hours", {}).get("weekday_text", [])
@@ -237,79 +596,16 @@ def get_venue_opening_hours(results: list[dict]) -> list[tuple[str, dict[str, st
 
 
 def is_open(periods: list[dict], day: int, time: str) -> bool:
-    t_user = int(time)
-    for p in periods:
-        o = p.get("open")
-        if not o:
-            continue
-        o_day, o_time = o["day"], int(o["time"])
-        c = p.get("close")
-        if c:
-            c_day, c_time = c["day"], int(c["time"])
-        else:
-            c_day, c_time = o_day, 2359
-        if o_day == c_day:
-            if day == o_day and o_time <= t_user < c_time:
-                return True
-        else:
-            if day == o_day and t_user >= o_time:
-                return True
-            if day == c_day and t_user < c_time:
-                return True
-    return False
+    return period_is_open(periods, day, time)
 
 
-def create_venue_map(venues):
-    if not venues:
-        return
-    center_lat, center_lng = None, None
-    for venue in venues:
-        if "geometry" in venue and "location" in venue["geometry"]:
-            center_lat = venue["geometry"]["location"]["lat"]
-            center_lng = venue["geometry"]["location"]["lng"]
-            break
-    if center_lat is None or center_lng is None:
-        st.error("No valid venue coordinates found")
-        return
-    m = folium.Map(location=[center_lat, center_lng], zoom_start=13)
-    for venue in venues:
-        if "geometry" not in venue or "location" not in venue["geometry"]:
-            continue
-        lat = venue["geometry"]["location"]["lat"]
-        lng = venue["geometry"]["location"]["lng"]
-        name = venue["name"]
-        address = venue.get("vicinity", "Address not available")
-        rating = venue.get("rating", "No rating")
-        place_id = venue.get("place_id", "")
-        if place_id:
-            google_maps_url = f"https://www.google.com/maps/place/?q=place_id:{place_id}"
-        else:
-            google_maps_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lng}"
-        popup_html = f"""
-        <div style="width:200px;border-radius:25px;">
-            <h4>{name}</h4>
-            <p><b>Address:</b> {address}</p>
-            <p><b>Rating:</b> {rating}/5</p>
-            <p><a href="{google_maps_url}" target="_blank">View on Google Maps</a></p>
-        </div>
-        """
-        tooltip_html = f"<div style='width:100%;font-size:16px'><strong>{name}</strong>"
-        folium.Marker(
-            location=[lat, lng],
-            tooltip=tooltip_html,
-            popup=folium.Popup(popup_html, max_width=300),
-            icon=folium.Icon(color='red')
-        ).add_to(m)
-    if len(venues) > 1:
-        coordinates = []
-        for venue in venues:
-            if "geometry" in venue and "location" in venue["geometry"]:
-                lat = venue["geometry"]["location"]["lat"]
-                lng = venue["geometry"]["location"]["lng"]
-                coordinates.append([lat, lng])
-        if coordinates:
-            m.fit_bounds(coordinates)
-    folium_static(m, width=700, height=500)
+# UI helpers live in venueViews; resolved lazily so the search path never imports streamlit or folium
+_UI_EXPORTS = {"create_venue_map"}
+def __getattr__(name):
+    if name in _UI_EXPORTS:
+        import venueViews
+        return getattr(venueViews, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -324,4 +620,5 @@ if __name__ == "__main__":
         event_time="tomorrow evening",
         max_results=5
     )
+    from venueViews import create_venue_map
     create_venue_map(venues)
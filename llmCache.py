@@ -0,0 +1,82 @@
+import os, json, hashlib
+from autogen import ConversableAgent
+from cacheStore import PersistentTTLCache, MISSING
+from conversationState import state_for
+
+# extractors (default): preference agents and structured extraction | all: also conversational agents | off
+LLM_CACHE_MODE = os.environ.get("EVENTPLANNER_LLM_CACHE", "extractors")
+LLM_CACHE_TTL = float(os.environ.get("EVENTPLANNER_LLM_CACHE_TTL", 30 * 86_400))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("EVENTPLANNER_LLM_CACHE_MAX_ENTRIES", 20_000))
+
+# Agent -> (trailing messages in the key, collected preferences the reply also depends on, conversational)
+CACHED_AGENTS = {
+    "Event_Type_Preference_Agent": (2, (), False),
+    "Event_Participant_Preference_Agent": (2, (), False),
+    "Event_Budget_Preference_Agent": (2, ("participants",), False),
+    "Event_Time_Preference_Agent": (2, (), False),
+    "Event_Location_Preference_Agent": (2, (), False),
+    "Event_Request_Preference_Agent": (2, (), False),
+    "Event_Recommendation_Agent": (3, (), True),
+}
+
+_LLM_CACHE = None
+def get_llm_cache() -> PersistentTTLCache:
+    # Shared by every session served from this cache directory
+    global _LLM_CACHE
+    if _LLM_CACHE is None:
+        _LLM_CACHE = PersistentTTLCache("llm_responses", default_ttl=LLM_CACHE_TTL,
+                                        max_memory_entries=512, max_disk_entries=LLM_CACHE_MAX_ENTRIES)
+    return _LLM_CACHE
+
+
+def cache_key(model: str, system_message: str, window: list[dict], context: dict = None) -> str:
+    payload = {
+        "model": model,
+        "system": system_message,
+        "messages": [{"role": m.get("role"), "name": m.get("name"), "content": m.get("content")} for m in window],
+        "context": context or {},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def agent_cache_enabled(name: str) -> bool:
+    if LLM_CACHE_MODE == "off" or name not in CACHED_AGENTS:
+        return False
+    return LLM_CACHE_MODE == "all" or not CACHED_AGENTS[name][2]
+
+
+def enable_reply_cache(agent, model: str) -> bool:
+    """Answer `agent`'s LLM turns from the cache when the same prompt window was seen before.
+
+    Registered in front of the LLM reply, so replies registered later at position 0 (rules,
+    deterministic searches) still run first.
+    """
+    if not agent_cache_enabled(agent.name):
+        return False
+    window, context_keys, _ = CACHED_AGENTS[agent.name]
+
+    def cached_llm_reply(recipient, messages=None, sender=None, config=None):
+        if not messages:
+            return False, None
+        context = {}
+        groupchat = getattr(sender, "groupchat", None)
+        if context_keys and groupchat is not None:
+            prefs = state_for(groupchat).preferences
+            context = {key: prefs.get(key) for key in context_keys}
+        key = cache_key(model, recipient.system_message, messages[-window:], context)
+        cache = get_llm_cache()
+        cached = cache.get(key)
+        if cached is not MISSING:
+            return True, cached
+        final, reply = recipient.generate_oai_reply(messages, sender, None)
+        # Tool calls and empty replies are not worth replaying
+        if final and isinstance(reply, str) and reply.strip():
+            cache.set(key, reply)
+        return final, reply
+
+    agent.register_reply([ConversableAgent, None], cached_llm_reply, position=0)
+    return True
+
+
+def llm_cache_stats() -> dict:
+    return get_llm_cache().stats()
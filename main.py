@@ -2,6 +2,14 @@ from dotenv import load_dotenv
 from autogen import GroupChat, GroupChatManager
 import os, sys, googlemaps
 from agents import create_preference_agents
+from venueSearch import DIRECT_SEARCH, parse_venue_list
+from conversationState import state_for, FALLBACK_QUESTIONS
+from chatHistory import ChatHistory, BoundedSeen
+from preferenceExtraction import UPFRONT_EXTRACTION
+from llmCache import llm_cache_stats
+from chatStream import StreamlitIOStream
+from helperFunctions import search_progress
+from autogen.io import IOStream
 import streamlit as st
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -16,56 +24,26 @@ load_dotenv()
 os.environ.pop("OPENAI_API_KEY", None)
 os.environ.pop("GOOGLEMAPS_API_KEY", None)
 
+def search_agent_name():
+    # In-process structured search, or the original generate-then-execute pair
+    return "Venue_Search_Agent" if DIRECT_SEARCH else "Code_Generator_Agent"
+
+# Agent that asks for each preference, in asking order
+PREFERENCE_AGENTS = {
+    "event_type": "Event_Type_Preference_Agent",
+    "participants": "Event_Participant_Preference_Agent",
+    "budget_per_person": "Event_Budget_Preference_Agent",
+    "event_time": "Event_Time_Preference_Agent",
+    "location": "Event_Location_Preference_Agent",
+    "special_requests": "Event_Request_Preference_Agent",
+}
+
 def custom_speaker_selection(last_speaker, groupchat):
     messages = groupchat.messages
-    
-    
-    # Get the current state of collected information
-    state = {
-        "event_type": False,
-        "participants": False,
-        "budget": False,
-        "time": False,
-        "location": False,
-        "special_requests": False,
-        "fallback_choice_made": False,
-        "waiting_for_fallback_details": False,
-        "fallback_json_ready": False
-    }
-    
-    # Go over the messages to determine what has been collected
-    for msg in messages:
-        content = msg.get("content", "")
-        if isinstance(content, str):
-            if '{"event_type"' in content:
-                state["event_type"] = True
-            elif '{"participants"' in content:
-                state["participants"] = True
-            elif '{"budget_per_person"' in content:
-                state["budget"] = True
-            elif '{"event_time"' in content:
-                state["time"] = True
-            elif '{"location"' in content:
-                state["location"] = True
-            elif '{"special_requests"' in content:
-                state["special_requests"] = True
-            elif '{"fallback":' in content:
-                state["fallback_json_ready"] = True
-
-            # Fallback choice made
-            elif content.strip() in ["1", "2", "3", "4", "5"] and any("Would you like me to try" in m.get("content", "") for m in messages[-3:]):
-                state["fallback_choice_made"] = True
-
-            # Check if recommendation agent is asking for fallback details
-            elif any(phrase in content.lower() for phrase in [
-                "how much larger should i search",
-                "which nearby location would you like",
-                "what's your new budget per person", 
-                "what type of event would you like to try"
-            ]):
-                state["waiting_for_fallback_details"] = True
-    
-    
+
+    # Collected fields and fallback phase, updated from the messages added since the last turn
+    state = state_for(groupchat)
+
     selected_agent = None
     
     # If last speaker was proxy agent with user input, route appropriately
@@ -73,21 +51,14 @@ def custom_speaker_selection(last_speaker, groupchat):
         # Check what the user input was
         user_msg = messages[-1].get("content", "") if messages else ""
         
+        # First user message: pull out everything it already says in one go
+        if UPFRONT_EXTRACTION and not state["extracted"] and state.next_missing() == "event_type":
+            selected_agent = groupchat.agent_by_name("Preference_Extraction_Agent")
         # Normal preference collection flow
-        if not state["event_type"]:
-            selected_agent = groupchat.agent_by_name("Event_Type_Preference_Agent")
-        elif not state["participants"]:
-            selected_agent = groupchat.agent_by_name("Event_Participant_Preference_Agent")
-        elif not state["budget"]:
-            selected_agent = groupchat.agent_by_name("Event_Budget_Preference_Agent")
-        elif not state["time"]:
-            selected_agent = groupchat.agent_by_name("Event_Time_Preference_Agent")
-        elif not state["location"]:
-            selected_agent = groupchat.agent_by_name("Event_Location_Preference_Agent")
-        elif not state["special_requests"]:
-            selected_agent = groupchat.agent_by_name("Event_Request_Preference_Agent")
-        elif all(state[key] for key in ["event_type", "participants", "budget", "time", "location", "special_requests"]) and not any([state["fallback_choice_made"], state["waiting_for_fallback_details"], state["fallback_json_ready"]]):
-            selected_agent = groupchat.agent_by_name("Code_Generator_Agent")
+        elif state.next_missing():
+            selected_agent = groupchat.agent_by_name(PREFERENCE_AGENTS[state.next_missing()])
+        elif state.all_collected and not state.in_fallback:
+            selected_agent = groupchat.agent_by_name(search_agent_name())
         
         # Fallback flow handling
         elif user_msg.strip() in ["1", "2", "3", "4", "5"]:
@@ -111,28 +82,27 @@ def custom_speaker_selection(last_speaker, groupchat):
             last_msg = messages[-1].get("content", "") if messages else ""
             
             if any(pattern in last_msg for pattern in ['{"event_type"', '{"participants"', '{"budget_per_person"', '{"event_time"', '{"location"', '{"special_requests"']):
-                # Agent collected data, move to next
-                if state["event_type"] and not state["participants"]:
-                    selected_agent = groupchat.agent_by_name("Event_Participant_Preference_Agent")
-                elif state["participants"] and not state["budget"]:
-                    selected_agent = groupchat.agent_by_name("Event_Budget_Preference_Agent")
-                elif state["budget"] and not state["time"]:
-                    selected_agent = groupchat.agent_by_name("Event_Time_Preference_Agent")
-                elif state["time"] and not state["location"]:
-                    selected_agent = groupchat.agent_by_name("Event_Location_Preference_Agent")
-                elif state["location"] and not state["special_requests"]:
-                    selected_agent = groupchat.agent_by_name("Event_Request_Preference_Agent")
-                elif all(state[key] for key in ["event_type", "participants", "budget", "time", "location", "special_requests"]):
-                    selected_agent = groupchat.agent_by_name("Code_Generator_Agent")
+                # Agent collected data, move to the next missing field
+                if state.next_missing():
+                    selected_agent = groupchat.agent_by_name(PREFERENCE_AGENTS[state.next_missing()])
+                elif state.all_collected:
+                    selected_agent = groupchat.agent_by_name(search_agent_name())
             else:
                 # Agent asking question, go to proxy
                 selected_agent = groupchat.agent_by_name("Event_Preference_Proxy_Agent")
         
+        elif last_speaker.name == "Preference_Extraction_Agent":
+            # Ask only for what the first message left out
+            if state.next_missing():
+                selected_agent = groupchat.agent_by_name(PREFERENCE_AGENTS[state.next_missing()])
+            else:
+                selected_agent = groupchat.agent_by_name(search_agent_name())
+
         # Handle code generation and execution
         elif last_speaker.name == "Code_Generator_Agent":
             selected_agent = groupchat.agent_by_name("Code_Executor_Agent")
             
-        elif last_speaker.name == "Code_Executor_Agent":
+        elif last_speaker.name in ("Code_Executor_Agent", "Venue_Search_Agent"):
             last_msg = messages[-1].get("content", "") if messages else ""
             if "No venues found" in last_msg or "Would you like me to try" in last_msg:
                 # Code executor detected empty results and asked for fallback choice
@@ -145,14 +115,9 @@ def custom_speaker_selection(last_speaker, groupchat):
             last_msg = messages[-1].get("content", "") if messages else ""
             
             if '{"fallback":' in last_msg:
-                # Recommendation agent provided fallback JSON, generate new code
-                selected_agent = groupchat.agent_by_name("Code_Generator_Agent")
-            elif any(phrase in last_msg.lower() for phrase in [
-                "how much larger should i search",
-                "which nearby location would you like",
-                "what's your new budget per person",
-                "what type of event would you like to try"
-            ]):
+                # Recommendation agent provided fallback JSON, search again
+                selected_agent = groupchat.agent_by_name(search_agent_name())
+            elif any(phrase in last_msg.lower() for phrase in FALLBACK_QUESTIONS):
                 # Recommendation agent asked a question, wait for user input
                 selected_agent = groupchat.agent_by_name("Event_Preference_Proxy_Agent")
             else:
@@ -190,23 +155,18 @@ def process_chat_messages():
     
     messages = st.session_state.manager.groupchat.messages
     
-    # Initialize tracking sets
-    if "processed_indices" not in st.session_state:
-        st.session_state.processed_indices = set()
+    # High-water mark into the group chat messages; everything before it is already processed
+    if "processed_count" not in st.session_state:
+        st.session_state.processed_count = 0
     if "displayed_questions" not in st.session_state:
-        st.session_state.displayed_questions = set()
+        st.session_state.displayed_questions = BoundedSeen()
     
     
     new_messages_found = False
     
-    for i, msg in enumerate(messages):
-        # Skip if already processed
-        if i in st.session_state.processed_indices:
-            continue
-        
-        # Mark as processed immediately
-        st.session_state.processed_indices.add(i)
-        
+    start = st.session_state.processed_count
+    st.session_state.processed_count = len(messages)
+    for msg in messages[start:]:
         # Extract message details
         if isinstance(msg, dict):
             content = msg.get("content", "")
@@ -243,73 +203,44 @@ def process_chat_messages():
                     continue
                 
                 # Question/statement from the agent
-                if line not in st.session_state.displayed_questions:
-                    st.session_state.displayed_questions.add(line)
+                if st.session_state.displayed_questions.add(line):
                     # Check if it's already in history
-                    if line not in [h[1] for h in st.session_state.history]:
-                        st.session_state.history.append(("assistant", line))
+                    if st.session_state.history.append_new("assistant", line):
                         print(f"Added to history: {line}")
                         new_messages_found = True
                 break
             
-        elif name in ["Code_Generator_Agent", "Code_Executor_Agent"]:
+        elif name in ["Code_Generator_Agent", "Code_Executor_Agent", "Venue_Search_Agent"]:
             # Check for venue data FIRST, before skipping
-            if name == "Code_Executor_Agent":
-                content_stripped = content.strip()
-                json_content = None
-
-                # Handle different output formats
-                # Format 1: "exitcode: 0 (execution succeeded)\nCode output:\n[JSON]"
-                if "exitcode:" in content_stripped and "Code output:" in content_stripped:
-                    parts = content_stripped.split("Code output:", 1)
-                    if len(parts) > 1:
-                        json_content = parts[1].strip()
-                # Format 2: Direct JSON output
-                elif content_stripped.startswith('['):
-                    json_content = content_stripped
-                
-                if json_content and json_content.startswith('[') and json_content.endswith(']'):
-                    try:
-                        import json
-                        venues_data = json.loads(json_content)
-                                
-                        # Verify it's a list of venue objects
-                        if (isinstance(venues_data, list) and 
-                            len(venues_data) > 0 and 
-                            all(isinstance(v, dict) and 'name' in v for v in venues_data)):
-                            
-                            # Store venues for map display
-                            st.session_state.current_venues = venues_data
-                            st.session_state.show_map = True
-                            print(f"Captured {len(venues_data)} venues for map display")
-                            
-                            # Debug first venue
-                            first_venue = venues_data[0]
-                            print(f"First venue: {first_venue.get('name', 'Unknown')}")
-                            if 'geometry' in first_venue and 'location' in first_venue['geometry']:
-                                loc = first_venue['geometry']['location']
-                                print(f"Location: lat={loc.get('lat')}, lng={loc.get('lng')}")
-                            else:
-                                print("Warning: First venue missing geometry data")
-                                
-                    except json.JSONDecodeError as e:
-                        print(f"Failed to parse venue JSON: {e}")
-                    except Exception as e:
-                        print(f"Error processing venues: {e}")
+            if name in ["Code_Executor_Agent", "Venue_Search_Agent"]:
+                venues_data = parse_venue_list(content)
+                if venues_data:
+                    # Store venues for map display
+                    st.session_state.current_venues = venues_data
+                    st.session_state.show_map = True
+                    print(f"Captured {len(venues_data)} venues for map display")
+
+                    # Debug first venue
+                    first_venue = venues_data[0]
+                    print(f"First venue: {first_venue.get('name', 'Unknown')}")
+                    if 'geometry' in first_venue and 'location' in first_venue['geometry']:
+                        loc = first_venue['geometry']['location']
+                        print(f"Location: lat={loc.get('lat')}, lng={loc.get('lng')}")
+                    else:
+                        print("Warning: First venue missing geometry data")
             
             # regular skipping for display purposes
             if not (content.strip().startswith('{') or 
                    content.strip().startswith('[') or 
                    content.strip().startswith('exitcode') or
                    content.strip().startswith('```')):
-                if content not in [h[1] for h in st.session_state.history]:
-                    st.session_state.history.append(("assistant", content))
+                if st.session_state.history.append_new("assistant", content):
                     new_messages_found = True
 
         elif name == "Event_Recommendation_Agent":
             # show everything except JSON
             if not content.strip().startswith('{'):
-                if content not in [h[1] for h in st.session_state.history]:
+                if not st.session_state.history.has_text(content):
                     # Check if this is the venue recommendations then add to history
                     if "Address:" in content and "Rating:" in content:
                         # Store recommendations separately instead of adding to history
@@ -338,7 +269,7 @@ def reset_session_state():
     """Reset all session state variables to restart the event planner"""
     keys_to_reset = [
         "initialized", "history", "chat_started", "coordinator_agent",
-        "displayed_messages", "processed_indices", "displayed_questions",
+        "displayed_messages", "processed_count", "displayed_questions",
         "current_venues", "show_map", "venue_recommendations", "manager",
         "proxy", "waiting_for_response"
     ]
@@ -348,7 +279,7 @@ def reset_session_state():
             del st.session_state[key]
     
     # Reset shown set instead of deleting it
-    st.session_state.shown = set()
+    st.session_state.shown = BoundedSeen()
 
 def check_api_keys():
     # Check API Keys from session state
@@ -453,12 +384,12 @@ llm_config = {
 # Initialize session state
 if "initialized" not in st.session_state:
     st.session_state.initialized = False
-    st.session_state.history = []
+    st.session_state.history = ChatHistory()
     st.session_state.chat_started = False
     st.session_state.coordinator_agent = None  
     st.session_state.displayed_messages = set()  
-    st.session_state.processed_indices = set()
-    st.session_state.displayed_questions = set()
+    st.session_state.processed_count = 0
+    st.session_state.displayed_questions = BoundedSeen()
     st.session_state.current_venues = None  
     st.session_state.show_map = False  
     st.session_state.venue_recommendations = None
@@ -468,7 +399,8 @@ if not st.session_state.initialized:
         # Create all agents with the provided API keys
         type_agent, participant_agent, budget_agent, time_agent, \
         location_agent, request_agent, proxy_agent, executor_agent, \
-        generator_agent, recommendation_agent, coordinator_agent = create_preference_agents(
+        generator_agent, recommendation_agent, coordinator_agent, \
+        venue_search_agent, extraction_agent = create_preference_agents(
             openai_key=openai_key,
             google_key=google_key
         )
@@ -480,6 +412,7 @@ if not st.session_state.initialized:
         group_chat = GroupChat(
             agents=[
                 coordinator_agent,      
+                extraction_agent,
                 type_agent,            
                 participant_agent,    
                 budget_agent,          
@@ -488,6 +421,7 @@ if not st.session_state.initialized:
                 request_agent,        
                 generator_agent,      
                 executor_agent,       
+                venue_search_agent,
                 recommendation_agent, 
                 proxy_agent          
             ],
@@ -526,7 +460,7 @@ if st.session_state.initialized and "manager" in st.session_state:
     # Check for unprocessed messages
     if hasattr(st.session_state.manager.groupchat, 'messages'):
         total_messages = len(st.session_state.manager.groupchat.messages)
-        processed_count = len(st.session_state.processed_indices) if "processed_indices" in st.session_state else 0
+        processed_count = st.session_state.get("processed_count", 0)
         
         if total_messages > processed_count:
             print(f"Found {total_messages - processed_count} unprocessed messages")
@@ -544,7 +478,7 @@ if st.session_state.get("show_map", False) and st.session_state.get("current_ven
         st.markdown("### Click on the markers to see venue details.")
         
         try:
-            from helperFunctions import create_venue_map
+            from venueViews import create_venue_map
             create_venue_map(st.session_state.current_venues)
         except Exception as e:
             st.error(f"Error: {str(e)}")
@@ -587,18 +521,19 @@ if user_input:
     # Set flag to indicate we're waiting for response
     st.session_state.waiting_for_response = True
     
-    # Process the message
-    with st.spinner("Processing your request..."):
+    # Process the message: stream LLM tokens and search steps into the page while the agents run
+    status = st.status("Processing your request...")
+    stream = StreamlitIOStream()
+    with IOStream.set_default(stream), search_progress(lambda message: status.update(label=message)):
         try:
             if not st.session_state.chat_started:
                 # Start the group chat
                 st.session_state.chat_started = True
                 
                 # Clear any previous processing state
-                if "processed_indices" in st.session_state:
-                    st.session_state.processed_indices = set()
+                st.session_state.processed_count = 0
                 if "displayed_questions" in st.session_state:
-                    st.session_state.displayed_questions = set()
+                    st.session_state.displayed_questions.clear()
                 
                 # Initiate the chat with the manager
                 st.session_state.proxy.initiate_chat(
@@ -620,6 +555,8 @@ if user_input:
             print(f"Error details: {e}")
             import traceback
             traceback.print_exc()
+    stream.finish()
+    status.update(label="Done", state="complete")
 
     st.rerun()
 
@@ -631,6 +568,11 @@ with st.sidebar:
     if check_api_keys():
         st.success(":white_check_mark: API Keys Configured")
 
+    llm_stats = llm_cache_stats()
+    if llm_stats["hits"] + llm_stats["misses"]:
+        st.caption(f"LLM cache: {llm_stats['hits']} of {llm_stats['hits'] + llm_stats['misses']} turns "
+                   f"served from cache ({llm_stats['hit_rate']:.0%})")
+
     
     # Add restart button at the top of sidebar
     if st.button("Restart New Event Planning", type="primary", use_container_width=True):
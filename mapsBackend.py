@@ -0,0 +1,361 @@
+import os, json, time, base64, hashlib, random, threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+from functools import lru_cache
+from math import floor, cos, radians, degrees
+import googlemaps.exceptions
+from venueIndex import haversine_m
+
+# live (default) | record | replay | synthetic
+MAPS_BACKEND = "MAPS_BACKEND"
+MAPS_FIXTURES = "MAPS_FIXTURES"
+
+PRICEABLE = {"restaurant", "cafe", "bar", "meal_takeaway", "meal_delivery", "night_club", "bakery"}
+MIXED_TYPES = ["restaurant", "cafe", "bar", "museum", "park", "night_club", "bakery"]
+DAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+_NAME_PARTS = (["Golden", "Little", "Old", "Blue", "Green", "Royal", "Corner", "Urban", "Hidden", "Grand"],
+               ["Oak", "Lantern", "Garden", "Harbor", "Fox", "Table", "Spoon", "Bridge", "Mill", "Square"])
+_STREETS = ["Main St", "Market Sq", "River Rd", "Station Ave", "Park Ln", "Church St", "Harbor Way"]
+_REVIEW_BANK = [
+    "Great food and friendly staff.", "Service was slow but the atmosphere made up for it.",
+    "Plenty of vegetarian options on the menu.", "Fully vegan kitchen, even the desserts are dairy-free.",
+    "They have gluten-free pasta and the waiter knew about celiac issues.", "All meat is halal.",
+    "Best steakhouse in town, the grill is amazing.", "Fresh seafood only, perfect for pescatarian friends.",
+    "Good wifi and lots of sockets, ideal for working.", "Quiet environment, you can actually talk.",
+    "Very loud on weekends.", "Outdoor seating with a lovely view.", "Kids friendly with a play corner.",
+    "Dog friendly, they even brought water for our dog.", "Live music on Friday nights.",
+    "Great cocktails and a cozy bar area.", "Prices are fair for the portion size.",
+    "Booked a private room for a birthday dinner, everything went smoothly.",
+]
+
+
+def _seeded(*parts) -> random.Random:
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _fixture_key(method: str, kwargs: dict) -> str:
+    def norm(value):
+        if isinstance(value, float):
+            return round(value, 6)
+        if isinstance(value, (list, tuple)):
+            return [norm(v) for v in value]
+        if isinstance(value, dict):
+            return {k: norm(v) for k, v in value.items()}
+        return value
+    return json.dumps([method, norm({k: v for k, v in kwargs.items() if v is not None})], sort_keys=True)
+
+
+class CallBudgetExceeded(Exception):
+    """A search ran out of its Maps call allowance or was cancelled."""
+
+
+class CallBudget:
+    """Maps call allowance for the searches run under `call_budget`, cancellable from another thread."""
+
+    def __init__(self, max_calls: int):
+        self.max_calls = max_calls
+        self.used = 0
+        self.exhausted = False
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def charge(self, method: str) -> None:
+        if self.cancelled.is_set():
+            raise CallBudgetExceeded(f"search cancelled before {method}")
+        with self._lock:
+            if self.used >= self.max_calls:
+                self.exhausted = True
+                raise CallBudgetExceeded(f"{method} would exceed the budget of {self.max_calls} calls")
+            self.used += 1
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+_CALL_BUDGET = ContextVar("maps_call_budget", default=None)
+
+@contextmanager
+def call_budget(budget: CallBudget):
+    """Charge every Maps call made in this context (and contexts copied from it) to `budget`."""
+    token = _CALL_BUDGET.set(budget)
+    try:
+        yield budget
+    finally:
+        _CALL_BUDGET.reset(token)
+
+
+def budget_intact() -> bool:
+    """False when the active call budget ran out or was cancelled, so results may be incomplete."""
+    budget = _CALL_BUDGET.get()
+    return budget is None or not (budget.exhausted or budget.cancelled.is_set())
+
+
+class CountingClient:
+    """Wraps any Maps client and counts calls per method."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, *args, **kwargs):
+        budget = _CALL_BUDGET.get()
+        if budget is not None:
+            budget.charge(method)
+        with self._lock:
+            self.calls[method] += 1
+        return getattr(self.inner, method)(*args, **kwargs)
+
+    def geocode(self, *args, **kwargs):
+        return self._call("geocode", *args, **kwargs)
+
+    def places_nearby(self, *args, **kwargs):
+        return self._call("places_nearby", *args, **kwargs)
+
+    def place(self, *args, **kwargs):
+        return self._call("place", *args, **kwargs)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls.clear()
+
+
+class RecordingClient:
+    """Forwards to a live client and writes every response to a JSON fixture file."""
+
+    def __init__(self, inner, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self._fixtures = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._fixtures = json.load(f)
+
+    def _record(self, method: str, **kwargs):
+        response = getattr(self.inner, method)(**kwargs)
+        with self._lock:
+            self._fixtures[_fixture_key(method, kwargs)] = response
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._fixtures, f, ensure_ascii=False, indent=1)
+        return response
+
+    def geocode(self, address: str, **kwargs):
+        return self._record("geocode", address=address, **kwargs)
+
+    def places_nearby(self, **kwargs):
+        return self._record("places_nearby", **kwargs)
+
+    def place(self, place_id: str, **kwargs):
+        return self._record("place", place_id=place_id, **kwargs)
+
+
+class ReplayClient:
+    """Serves responses recorded by RecordingClient; unknown requests raise ApiError("NOT_FOUND")."""
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            self._fixtures = json.load(f)
+
+    def _replay(self, method: str, **kwargs):
+        key = _fixture_key(method, kwargs)
+        if key not in self._fixtures:
+            raise googlemaps.exceptions.ApiError("NOT_FOUND", f"No recorded response for {key}")
+        return json.loads(json.dumps(self._fixtures[key]))
+
+    def geocode(self, address: str, **kwargs):
+        return self._replay("geocode", address=address, **kwargs)
+
+    def places_nearby(self, **kwargs):
+        return self._replay("places_nearby", **kwargs)
+
+    def place(self, place_id: str, **kwargs):
+        return self._replay("place", place_id=place_id, **kwargs)
+
+
+class SyntheticMapsClient:
+    """Deterministic fake world answering geocode, places_nearby and place like the Google Maps client.
+
+    Venues are generated per ~1 km grid cell from the seed, so overlapping searches see the same
+    places. `latency` is the mean simulated delay per call in seconds, `error_rate` the share of
+    calls that fail, and `token_delay` how long a next_page_token stays invalid.
+    """
+
+    CELL_DEG = 0.01
+    PAGE_SIZE = 20
+    MAX_RESULTS = 60
+
+    def __init__(self, seed: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 density: int = 4, reviews_per_place: int = 5, token_delay: float = 0.0):
+        self.seed = seed
+        self.latency = latency
+        self.error_rate = error_rate
+        self.density = density
+        self.reviews_per_place = reviews_per_place
+        self.token_delay = token_delay
+        self._rng = random.Random(seed)
+        self._venues = lru_cache(maxsize=65_536)(self._cell_venues)
+
+    def _simulate(self) -> None:
+        if self.latency > 0:
+            time.sleep(self._rng.expovariate(1 / self.latency))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise googlemaps.exceptions.ApiError("UNKNOWN_ERROR", "Simulated failure")
+
+    # --- world ---
+    def _cell_venues(self, i: int, j: int, place_type: str) -> tuple:
+        rng = _seeded(self.seed, i, j, place_type)
+        return tuple(self._venue(f"syn:{place_type}:{i}:{j}:{k}") for k in range(rng.randint(0, self.density)))
+
+    def _venue(self, place_id: str) -> dict:
+        _, place_type, i, j, k = place_id.split(":")
+        place_type = place_type if place_type != "any" else None
+        rng = _seeded(self.seed, place_id)
+        kind = place_type or rng.choice(MIXED_TYPES)
+        venue = {
+            "place_id": place_id,
+            "name": f"{rng.choice(_NAME_PARTS[0])} {rng.choice(_NAME_PARTS[1])} {kind.replace('_', ' ').title()}",
+            "geometry": {"location": {"lat": (int(i) + rng.random()) * self.CELL_DEG,
+                                      "lng": (int(j) + rng.random()) * self.CELL_DEG}},
+            "vicinity": f"{rng.randint(1, 200)} {rng.choice(_STREETS)}",
+            "rating": round(rng.uniform(2.8, 5.0), 1),
+            "user_ratings_total": int(rng.lognormvariate(4, 1.3)),
+            "types": [kind, "point_of_interest", "establishment"],
+            "business_status": "OPERATIONAL",
+        }
+        if kind in PRICEABLE:
+            venue["price_level"] = rng.randint(1, 4)
+        return venue
+
+    def _search(self, location, radius, type=None, keyword=None, min_price=None, max_price=None, **_):
+        lat, lng = location
+        dlat = degrees(radius / 6_371_000)
+        dlng = dlat / max(cos(radians(lat)), 1e-6)
+        hits = []
+        for i in range(floor((lat - dlat) / self.CELL_DEG), floor((lat + dlat) / self.CELL_DEG) + 1):
+            for j in range(floor((lng - dlng) / self.CELL_DEG), floor((lng + dlng) / self.CELL_DEG) + 1):
+                for v in self._venues(i, j, type or "any"):
+                    loc = v["geometry"]["location"]
+                    if haversine_m(lat, lng, loc["lat"], loc["lng"]) > radius:
+                        continue
+                    price = v.get("price_level")
+                    if (min_price is not None or max_price is not None) and price is None:
+                        continue
+                    if max_price is not None and price > max_price:
+                        continue
+                    if min_price is not None and price < min_price:
+                        continue
+                    if keyword and _seeded(self.seed, v["place_id"], keyword).random() > 0.6:
+                        continue
+                    hits.append(v)
+        hits.sort(key=lambda v: (-v["user_ratings_total"], v["place_id"]))
+        return hits[:self.MAX_RESULTS]
+
+    # --- client API ---
+    def places_nearby(self, location=None, radius=None, page_token=None, **kwargs):
+        self._simulate()
+        if page_token:
+            state = json.loads(base64.urlsafe_b64decode(page_token))
+            if time.time() - state["issued"] < self.token_delay:
+                raise googlemaps.exceptions.ApiError("INVALID_REQUEST")
+            query, offset = state["query"], state["offset"]
+        else:
+            query = {"location": list(location), "radius": radius, **kwargs}
+            offset = 0
+        hits = self._search(**query)
+        response = {"status": "OK", "html_attributions": [],
+                    "results": [json.loads(json.dumps(v)) for v in hits[offset:offset + self.PAGE_SIZE]]}
+        if offset + self.PAGE_SIZE < len(hits):
+            state = {"query": query, "offset": offset + self.PAGE_SIZE, "issued": time.time()}
+            response["next_page_token"] = base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+        return response
+
+    def place(self, place_id: str, fields: list[str] = None, **_):
+        self._simulate()
+        try:
+            venue = self._venue(place_id)
+        except ValueError:
+            raise googlemaps.exceptions.ApiError("NOT_FOUND")
+        rng = _seeded(self.seed, place_id, "details")
+        details = dict(venue)
+        hours = self._opening_hours(rng)
+        if hours:
+            details["opening_hours"] = hours
+        details["reviews"] = [
+            {"author_name": f"Guest {n}", "rating": rng.randint(1, 5),
+             "text": " ".join(rng.sample(_REVIEW_BANK, rng.randint(2, 4)))}
+            for n in range(self.reviews_per_place)
+        ]
+        if fields:
+            keys = {f.split("/", 1)[0] for f in fields}
+            details = {k: v for k, v in details.items() if k in keys}
+        return {"status": "OK", "html_attributions": [], "result": details}
+
+    def _opening_hours(self, rng: random.Random) -> dict | None:
+        pattern = rng.random()
+        if pattern < 0.1:
+            return None
+        if pattern < 0.2:
+            return {"periods": [{"open": {"day": 0, "time": "0000"}}],
+                    "weekday_text": [f"{d}: Open 24 hours" for d in DAYS[1:] + DAYS[:1]]}
+        overnight = pattern > 0.75
+        closed_day = rng.choice([None, 0, 1])
+        o_hour = rng.choice([17, 18, 19]) if overnight else rng.choice([7, 8, 9, 11, 12])
+        c_hour = rng.choice([1, 2, 3]) if overnight else rng.choice([17, 20, 22, 23])
+        periods, text = [], {}
+        for day in range(7):
+            if day == closed_day:
+                text[day] = f"{DAYS[day]}: Closed"
+                continue
+            periods.append({"open": {"day": day, "time": f"{o_hour:02d}00"},
+                            "close": {"day": (day + 1) % 7 if overnight else day, "time": f"{c_hour:02d}00"}})
+            text[day] = f"{DAYS[day]}: {o_hour:02d}:00 – {c_hour:02d}:00"
+        return {"periods": periods, "weekday_text": [text[d] for d in [1, 2, 3, 4, 5, 6, 0]]}
+
+    def geocode(self, address: str, **_):
+        self._simulate()
+        normalized = " ".join((address or "").casefold().split())
+        if not normalized or "nowhere" in normalized:
+            return []
+        rng = _seeded(self.seed, normalized)
+        lat, lng = rng.uniform(-40, 60), rng.uniform(-120, 140)
+        country = address.split(",")[-1].strip() if "," in address else "Synthland"
+        return [{
+            "formatted_address": address.strip(),
+            "geometry": {"location": {"lat": lat, "lng": lng},
+                         "viewport": {"northeast": {"lat": lat + 0.1, "lng": lng + 0.1},
+                                      "southwest": {"lat": lat - 0.1, "lng": lng - 0.1}}},
+            "address_components": [{"long_name": country, "short_name": country[:2].upper(),
+                                    "types": ["country", "political"]}],
+            "place_id": f"geo_{hashlib.sha1(normalized.encode()).hexdigest()[:12]}",
+        }]
+
+
+def backend_name() -> str:
+    return os.environ.get(MAPS_BACKEND, "live").strip().lower()
+
+
+def create_client(key: str = None):
+    """Build the Maps client selected by MAPS_BACKEND, wrapped in a CountingClient."""
+    backend = backend_name()
+    if backend == "synthetic":
+        inner = SyntheticMapsClient(
+            seed=int(os.environ.get("MAPS_SYNTHETIC_SEED", 0)),
+            latency=float(os.environ.get("MAPS_SYNTHETIC_LATENCY", 0.0)),
+            error_rate=float(os.environ.get("MAPS_SYNTHETIC_ERROR_RATE", 0.0)),
+        )
+    elif backend == "replay":
+        inner = ReplayClient(os.environ[MAPS_FIXTURES])
+    elif backend in ("live", "record"):
+        if not key:
+            raise ValueError("GOOGLEMAPS_API_KEY is not set. Provide it in the UI.")
+        import googlemaps
+        inner = googlemaps.Client(key=key)
+        if backend == "record":
+            inner = RecordingClient(inner, os.environ[MAPS_FIXTURES])
+    else:
+        raise ValueError(f"Unknown {MAPS_BACKEND}: {backend}")
+    return CountingClient(inner)
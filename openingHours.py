@@ -0,0 +1,99 @@
+from functools import lru_cache
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def week_minute(day, time):
+    """Minute of the week (Sunday 00:00 = 0) for Google day numbers and "HHMM" strings; accepts arrays."""
+    hhmm = np.asarray(time).astype(int)
+    return np.asarray(day) * MINUTES_PER_DAY + (hhmm // 100) * 60 + hhmm % 100
+
+
+def _periods_key(periods: list[dict]) -> tuple:
+    key = []
+    for p in periods:
+        o = p.get("open")
+        if not o:
+            continue
+        c = p.get("close")
+        key.append((o["day"], o["time"], c["day"] if c else None, c["time"] if c else None))
+    return tuple(key)
+
+
+@lru_cache(maxsize=4096)
+def _compile(key: tuple) -> np.ndarray:
+    # A single open period starting Sunday 00:00 with no close is Google's "open 24 hours"
+    if len(key) == 1 and key[0][2] is None and key[0][0] == 0 and int(key[0][1]) == 0:
+        return np.array([[0, MINUTES_PER_WEEK]], dtype=np.int32)
+
+    intervals = []
+    for o_day, o_time, c_day, c_time in key:
+        start = int(week_minute(o_day, o_time))
+        if c_day is None:
+            end = (o_day + 1) * MINUTES_PER_DAY
+        else:
+            end = int(week_minute(c_day, c_time))
+            if end <= start:
+                end += MINUTES_PER_WEEK
+        if end > MINUTES_PER_WEEK:
+            intervals.append((start, MINUTES_PER_WEEK))
+            intervals.append((0, end - MINUTES_PER_WEEK))
+        else:
+            intervals.append((start, end))
+    compiled = np.array(intervals, dtype=np.int32).reshape(-1, 2)
+    compiled.setflags(write=False)
+    return compiled
+
+
+def compile_periods(periods: list[dict]) -> np.ndarray:
+    """Google `opening_hours.periods` as an (n, 2) array of [start, end) week-minute intervals.
+
+    Overnight and Saturday->Sunday periods are split at the week boundary. Results are memoized.
+    """
+    return _compile(_periods_key(periods))
+
+
+def period_is_open(periods: list[dict], day: int, time: str) -> bool:
+    intervals = compile_periods(periods)
+    t = week_minute(day, time)
+    return bool(np.any((intervals[:, 0] <= t) & (t < intervals[:, 1])))
+
+
+class OpeningHoursTable:
+    """Weekly opening hours of many venues as one sorted array of intervals, searched per query time.
+
+    Memory grows with the number of intervals rather than with venues x minutes of the week.
+    """
+
+    def __init__(self, periods_list: list[list[dict]]):
+        n = len(periods_list)
+        self.known = np.array([bool(p) for p in periods_list], dtype=bool)
+        compiled = [compile_periods(p) if p else np.empty((0, 2), dtype=np.int32) for p in periods_list]
+        counts = np.array([len(c) for c in compiled], dtype=np.intp)
+        rows = np.repeat(np.arange(n, dtype=np.int64), counts)
+        intervals = np.concatenate(compiled) if n and counts.sum() else np.empty((0, 2), dtype=np.int32)
+
+        # Each venue gets its own stretch of a single timeline, two weeks apart so stretches never touch
+        starts = rows * (2 * MINUTES_PER_WEEK) + intervals[:, 0]
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        # Running maximum of the ends, so overlapping intervals of one venue still cover each other
+        self.ends = np.maximum.accumulate(rows[order] * (2 * MINUTES_PER_WEEK) + intervals[order, 1])
+
+    def __len__(self) -> int:
+        return len(self.known)
+
+    def open_at(self, minutes, unknown_is_open: bool = True) -> np.ndarray:
+        """(venues x times) bool matrix for the given week minutes; venues without hours follow `unknown_is_open`."""
+        minutes = np.atleast_1d(np.asarray(minutes)) % MINUTES_PER_WEEK
+        keys = np.arange(len(self), dtype=np.int64)[:, None] * (2 * MINUTES_PER_WEEK) + minutes[None, :]
+        # The last interval starting at or before each time is the only one that can still be open
+        last = np.searchsorted(self.starts, keys, side="right") - 1
+        result = np.zeros(keys.shape, dtype=bool)
+        found = last >= 0
+        result[found] = keys[found] < self.ends[last[found]]
+        if unknown_is_open:
+            result[~self.known] = True
+        return result
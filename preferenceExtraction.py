@@ -0,0 +1,81 @@
+import os, re, json
+from openai import OpenAI
+from preferenceRules import EVENT_TYPE_MAP, NO_BUDGET_VALUE, extract_event_type
+from venueSearch import PREFERENCE_KEYS
+from cacheStore import MISSING
+from llmCache import LLM_CACHE_MODE, cache_key, get_llm_cache
+
+# Set EVENTPLANNER_UPFRONT_EXTRACTION=0 to always walk the preference agents one by one
+UPFRONT_EXTRACTION = os.environ.get("EVENTPLANNER_UPFRONT_EXTRACTION", "1") != "0"
+EXTRACTION_MODEL = os.environ.get("EVENTPLANNER_EXTRACTION_MODEL", "gpt-4o-mini")
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+_EVENT_TYPE_PHRASES = {phrase for phrases in EVENT_TYPE_MAP.values() for phrase in phrases}
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "event_type": {"type": ["string", "null"], "enum": [*EVENT_TYPE_MAP, None]},
+        "participants": {"type": ["integer", "null"]},
+        "budget_per_person": {"type": ["number", "null"]},
+        "event_time": _NULLABLE_STRING,
+        "location": _NULLABLE_STRING,
+        "special_requests": _NULLABLE_STRING,
+        "stated_fields": {"type": "array", "items": {"type": "string", "enum": list(PREFERENCE_KEYS)}},
+    },
+    "required": [*PREFERENCE_KEYS, "stated_fields"],
+    "additionalProperties": False,
+}
+
+_MAPPING = "\n".join(f"- {', '.join(phrases)} -> {event_type}" for event_type, phrases in EVENT_TYPE_MAP.items())
+EXTRACTION_PROMPT = f"""You extract event planning preferences from one user message.
+Fill a field only if the user actually stated it; list every field the user addressed in stated_fields,
+including ones they explicitly waived ("no budget", "anytime", "no special requests").
+
+- event_type: map to one type:
+{_MAPPING}
+- participants: integer head count.
+- budget_per_person: euros per person. Divide a total budget by participants. "No budget" or similar -> {NO_BUDGET_VALUE}.
+- event_time: the date/time words exactly as written, or null for "anytime"/"flexible"/undecided.
+- location: the place exactly as written.
+- special_requests: short lowercase keywords (e.g. "vegetarian", "quiet environment"), or null for none.
+Never guess a field the message does not mention."""
+
+
+def extract_preferences(text: str, api_key: str, model: str = EXTRACTION_MODEL) -> dict:
+    """Every preference stated in `text`, from one structured-output call. Unstated fields are left out."""
+    # "dinner" or "Drinks!" needs no model; "drinks tonight" also states a time, so it goes to the model
+    phrase = " ".join(re.findall(r"[\w']+", text.casefold()))
+    if phrase in _EVENT_TYPE_PHRASES or phrase.removesuffix("s") in _EVENT_TYPE_PHRASES:
+        quick = extract_event_type(text)
+        if quick is not None:
+            return quick
+
+    messages = [{"role": "system", "content": EXTRACTION_PROMPT}, {"role": "user", "content": text}]
+    key = cache_key(model, EXTRACTION_PROMPT, messages[1:])
+    data = get_llm_cache().get(key) if LLM_CACHE_MODE != "off" else MISSING
+    if data is MISSING:
+        response = OpenAI(api_key=api_key).chat.completions.create(
+            model=model,
+            temperature=0,
+            messages=messages,
+            response_format={"type": "json_schema",
+                             "json_schema": {"name": "event_preferences", "strict": True, "schema": EXTRACTION_SCHEMA}},
+        )
+        data = json.loads(response.choices[0].message.content)
+        if LLM_CACHE_MODE != "off":
+            get_llm_cache().set(key, data)
+    stated = set(data.get("stated_fields") or [])
+    values = {key: data.get(key) for key in PREFERENCE_KEYS if key in stated}
+    # A waived field is only meaningful for those whose prompts accept null
+    for key in ("event_type", "participants", "location"):
+        if values.get(key, 0) is None:
+            del values[key]
+    if "budget_per_person" in values and values["budget_per_person"] is None:
+        values["budget_per_person"] = NO_BUDGET_VALUE
+    return values
+
+
+def format_extraction(values: dict) -> str:
+    """One JSON object per field, the shape each preference agent would have produced."""
+    lines = [json.dumps({key: value}, ensure_ascii=False) for key, value in values.items()]
+    return "\n".join(lines or ["{}"]) + "\nTERMINATE"
@@ -0,0 +1,169 @@
+import re, json
+import parsedatetime
+
+# Same table as the Event_Type_Preference_Agent prompt, plus the normalized types themselves
+EVENT_TYPE_MAP = {
+    "restaurant": ["dinner party", "dinner", "lunch", "brunch", "meal", "food", "banquet", "restaurant"],
+    "bar": ["happy hour", "night out", "drinks", "cocktails", "bar", "pub"],
+    "cafe": ["coffee shop", "coffee", "café", "cafe", "tea"],
+    "park": ["green space", "picnic", "outdoors", "park"],
+    "museum": ["art exhibition", "museum", "gallery"],
+    "hotel": ["overnight", "lodging", "hotel", "stay"],
+    "movie_theater": ["film screening", "movie theater", "cinema", "movie", "film"],
+    "gym": ["workout", "exercise", "fitness", "gym"],
+    "book_store": ["book store", "bookstore", "library", "books"],
+    "stadium": ["stadium", "sports", "arena", "match"],
+}
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+}
+
+# Words that may surround an answer without making it ambiguous
+_COMMON_FILLER = {"a", "an", "the", "of", "for", "is", "it", "will", "be", "about", "around", "roughly",
+                  "approximately", "approx", "maybe", "we", "us", "our", "my", "i", "there", "are", "just",
+                  "say", "like", "think", "probably", "ok", "okay", "so", "hi", "hello", "please", "thanks"}
+PARTICIPANT_FILLER = _COMMON_FILLER | {"people", "persons", "person", "guests", "participants", "attendees",
+                                       "pax", "of", "in", "total", "group", "have", "expecting", "expect", "max",
+                                       "attending", "joining", "coming"}
+BUDGET_FILLER = _COMMON_FILLER | {"euro", "euros", "eur", "€", "per", "person", "each", "pp", "head", "a",
+                                  "budget", "max", "maximum", "up", "to", "under", "below", "less", "than",
+                                  "in", "total", "all", "everyone", "whole", "group", "altogether", "overall",
+                                  "can", "spend", "would", "like", "want"}
+TOTAL_MARKERS = {"total", "all", "everyone", "whole", "group", "altogether", "overall"}
+NEGATIONS = {"not", "no", "don't", "dont", "or", "but", "instead", "either", "rather"}
+
+NO_BUDGET_PHRASES = ("no budget", "unlimited", "no limit", "doesn't matter", "doesnt matter", "don't have a budget",
+                     "dont have a budget", "no specific budget", "don't have a specific budget", "any budget",
+                     "flexible")
+NO_TIME_PHRASES = ("no specific time", "anytime", "any time", "flexible", "doesn't matter", "doesnt matter",
+                   "no preference", "don't know", "dont know", "haven't decided", "havent decided", "not sure",
+                   "undecided")
+DAY_WORDS = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+            "weekend", "tonight", "tomorrow", "today"}
+NO_REQUEST_ANSWERS = {"no", "none", "nope", "nothing", "no thanks", "no thank you", "not really", "n/a", "na",
+                      "no special requests", "no requests", "no preferences", "nothing special"}
+# Budget used by the prompts for "no budget": large enough for every price level
+NO_BUDGET_VALUE = 1000
+
+_TOKEN = re.compile(r"€|[a-z0-9']+(?:[.,]\d+)?")
+_NUMBER = re.compile(r"^\d{1,3}(?:,\d{3})+(?:\.\d+)?$|^\d+(?:[.,]\d+)?$")
+_TYPE_PATTERNS = [
+    (event_type, re.compile(r"\b" + re.escape(phrase) + r"s?\b"))
+    for event_type, phrases in EVENT_TYPE_MAP.items() for phrase in phrases
+]
+_CALENDAR = parsedatetime.Calendar()
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().replace("’", "'").split())
+
+
+def _tokens(text: str) -> list[str]:
+    return _TOKEN.findall(_normalize(text))
+
+
+def _to_number(token: str) -> float | None:
+    if token in NUMBER_WORDS:
+        return float(NUMBER_WORDS[token])
+    if not _NUMBER.match(token):
+        return None
+    if re.match(r"^\d+,\d{1,2}$", token):
+        token = token.replace(",", ".")
+    return float(token.replace(",", ""))
+
+
+def _single_number(tokens: list[str], filler: set) -> float | None:
+    """The only number in an answer whose every other word is filler, else None."""
+    numbers, others = [], []
+    for token in tokens:
+        # "50€" and "40eur" arrive as one token
+        stripped = re.sub(r"(?:eur|euros?|€)$", "", token)
+        value = _to_number(stripped)
+        if value is not None:
+            numbers.append(value)
+        else:
+            others.append(token)
+    if len(numbers) != 1 or any(token not in filler for token in others):
+        return None
+    return numbers[0]
+
+
+def _as_number(value: float):
+    return int(value) if float(value).is_integer() else round(value, 2)
+
+
+def extract_event_type(text: str, prefs: dict = None) -> dict | None:
+    normalized = _normalize(text)
+    if "?" in normalized or NEGATIONS & set(_tokens(normalized)):
+        return None
+    found = {event_type for event_type, pattern in _TYPE_PATTERNS if pattern.search(normalized)}
+    if len(found) != 1:
+        return None
+    return {"event_type": found.pop()}
+
+
+def extract_participants(text: str, prefs: dict = None) -> dict | None:
+    count = _single_number(_tokens(text), PARTICIPANT_FILLER)
+    if count is None or count < 1 or not count.is_integer():
+        return None
+    return {"participants": int(count)}
+
+
+def extract_budget(text: str, prefs: dict = None) -> dict | None:
+    normalized = _normalize(text)
+    if any(phrase in normalized for phrase in NO_BUDGET_PHRASES) and not re.search(r"\d", normalized):
+        return {"budget_per_person": NO_BUDGET_VALUE}
+    tokens = _tokens(normalized)
+    amount = _single_number(tokens, BUDGET_FILLER)
+    if amount is None or amount <= 0:
+        return None
+    if TOTAL_MARKERS & set(tokens) and not {"per", "each", "pp", "head"} & set(tokens):
+        participants = (prefs or {}).get("participants")
+        if not isinstance(participants, int) or participants < 1:
+            return None
+        amount = amount / participants
+    return {"budget_per_person": _as_number(amount)}
+
+
+def extract_event_time(text: str, prefs: dict = None) -> dict | None:
+    normalized = _normalize(text)
+    if any(phrase in normalized for phrase in NO_TIME_PHRASES):
+        # "not sure about the time, maybe Friday at 8" still names a time: leave it to the LLM
+        if re.search(r"\d", normalized) or DAY_WORDS & set(_tokens(normalized)) or _CALENDAR.parse(normalized)[1]:
+            return None
+        return {"event_time": None}
+    if "?" in normalized or len(normalized.split()) > 8:
+        return None
+    _, status = _CALENDAR.parse(normalized)
+    if not status:
+        return None
+    return {"event_time": " ".join(text.split())}
+
+
+def extract_special_requests(text: str, prefs: dict = None) -> dict | None:
+    if _normalize(text).strip(" .!") in NO_REQUEST_ANSWERS:
+        return {"special_requests": None}
+    return None
+
+
+# Preference agent -> deterministic extractor for the answer it is waiting on
+RULE_EXTRACTORS = {
+    "Event_Type_Preference_Agent": extract_event_type,
+    "Event_Participant_Preference_Agent": extract_participants,
+    "Event_Budget_Preference_Agent": extract_budget,
+    "Event_Time_Preference_Agent": extract_event_time,
+    "Event_Request_Preference_Agent": extract_special_requests,
+}
+
+
+def is_user_answer(message: dict, user_name: str) -> bool:
+    content = message.get("content")
+    return (message.get("name") == user_name and isinstance(content, str)
+            and bool(content.strip()) and not content.lstrip().startswith("{"))
+
+
+def format_reply(values: dict) -> str:
+    """Same shape the LLM is prompted to produce."""
+    return f"{json.dumps(values, ensure_ascii=False)}\nTERMINATE"
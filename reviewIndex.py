@@ -0,0 +1,115 @@
+import os, re, json, time, sqlite3, threading
+from collections import Counter
+from cacheStore import CACHE_DIR
+from reviewMatcher import stem
+
+# Reviews change slowly enough that a month-old index still answers special requests well
+REVIEW_INDEX_MAX_AGE = float(os.environ.get("REVIEW_INDEX_MAX_AGE", 30 * 86_400))
+# Stale documents and their postings are pruned once every this many writes
+REVIEW_INDEX_PRUNE_EVERY = 200
+
+_TOKEN = re.compile(r"\w+")
+_REQUEST_SPLIT = re.compile(r"\s*(?:,|;|\band\b)\s*")
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(token) for token in _TOKEN.findall(text.casefold())]
+
+
+def request_terms(special_request: str) -> list[list[str]]:
+    """The stemmed tokens of each comma/"and"-separated part of a special request."""
+    parts = _REQUEST_SPLIT.split((special_request or "").casefold())
+    return [terms for terms in (tokenize(part) for part in parts) if terms]
+
+
+class ReviewIndex:
+    """Inverted index of the review text seen in Place Details: token -> place_id postings with counts.
+
+    Venues indexed within `max_age` answer special-request and dietary queries locally, without
+    fetching their reviews again. Dietary tags are matched with the full phrase matcher at ingestion.
+    """
+
+    def __init__(self, path: str = None, max_age: float = REVIEW_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        path = path or os.path.join(CACHE_DIR, "review_index.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                place_id TEXT PRIMARY KEY, reviews INTEGER NOT NULL, tags TEXT NOT NULL, indexed_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL, place_id TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (token, place_id));
+            CREATE INDEX IF NOT EXISTS postings_place ON postings (place_id);
+        """)
+        self._db.commit()
+        self._writes_since_prune = 0
+        self.prune()
+
+    def known(self, place_ids: list[str]) -> set[str]:
+        """The place_ids whose reviews were indexed recently enough to answer from."""
+        place_ids = [p for p in place_ids if p]
+        if not place_ids:
+            return set()
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT place_id FROM documents WHERE indexed_at >= ? AND place_id IN ({','.join('?' * len(place_ids))})",
+                (time.time() - self.max_age, *place_ids),
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def add(self, place_id: str, texts: list[str], tags: dict[str, int] = None) -> None:
+        """Replace the postings of `place_id` with those of `texts`; `tags` are its dietary tag hits."""
+        counts = Counter(token for text in texts for token in tokenize(text))
+        with self._lock:
+            self._db.execute("DELETE FROM postings WHERE place_id = ?", (place_id,))
+            self._db.executemany("INSERT INTO postings VALUES (?, ?, ?)",
+                                 [(token, place_id, count) for token, count in counts.items()])
+            self._db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                             (place_id, len(texts), json.dumps(tags or {}), time.time()))
+            self._db.commit()
+        self._wrote()
+
+    def _wrote(self) -> None:
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= REVIEW_INDEX_PRUNE_EVERY:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop documents older than `max_age` and their postings."""
+        stale = time.time() - self.max_age
+        with self._lock:
+            self._writes_since_prune = 0
+            self._db.execute("DELETE FROM documents WHERE indexed_at <= ?", (stale,))
+            self._db.execute("DELETE FROM postings WHERE place_id NOT IN (SELECT place_id FROM documents)")
+            self._db.commit()
+
+    def tags(self, place_id: str) -> dict[str, int]:
+        with self._lock:
+            row = self._db.execute("SELECT tags FROM documents WHERE place_id = ?", (place_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def match(self, place_ids: list[str], special_request: str) -> dict[str, int]:
+        """Per place_id, how often the request parts occur in its reviews.
+
+        A request part matches as often as its rarest token occurs, so "quiet environment" needs both words.
+        """
+        parts = request_terms(special_request)
+        results = {p: 0 for p in place_ids}
+        tokens = sorted({token for terms in parts for token in terms})
+        if not place_ids or not tokens:
+            return results
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT place_id, token, count FROM postings WHERE token IN ({','.join('?' * len(tokens))}) "
+                f"AND place_id IN ({','.join('?' * len(place_ids))})",
+                (*tokens, *place_ids),
+            ).fetchall()
+        postings = {}
+        for place_id, token, count in rows:
+            postings.setdefault(place_id, {})[token] = count
+
+        for place_id, counts in postings.items():
+            results[place_id] = sum(min(counts.get(token, 0) for token in terms) for terms in parts)
+        return results
@@ -0,0 +1,90 @@
+import re
+from functools import lru_cache
+
+REQUEST_TAG = "request"
+
+_SUFFIXES = ("ing", "es", "ed", "s")
+_WORD_SPLIT = re.compile(r"[\s-]+")
+_REQUEST_SPLIT = re.compile(r"\s*(?:,|;|\band\b)\s*")
+
+
+def stem(word: str) -> str:
+    """Very small suffix stripper: "allowed" -> "allow", "dishes" -> "dish"."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def _word_pattern(word: str) -> str:
+    if word[-1].isalpha():
+        return re.escape(stem(word)) + r"(?:e|s|es|ed|ing)?"
+    return re.escape(word)
+
+
+def phrase_pattern(phrase: str) -> str:
+    """Regex for `phrase` with word boundaries, flexible space/hyphen joins and stemmed words."""
+    words = [w for w in _WORD_SPLIT.split(phrase.casefold()) if w]
+    body = r"[\s-]+".join(_word_pattern(w) for w in words)
+    start = r"\b" if re.match(r"\w", words[0]) else ""
+    end = r"\b" if re.search(r"\w$", words[-1]) else ""
+    return start + body + end
+
+
+class ReviewMatcher:
+    """One compiled alternation over the special-request phrases and every dietary keyword.
+
+    Each review is scanned once; `scan` returns the number of special-request hits and, per
+    dietary tag, how many reviews mention it.
+    """
+
+    def __init__(self, special_request: str = None, dietary_keywords: dict[str, list[str]] = None):
+        entries = []
+        if special_request:
+            for part in _REQUEST_SPLIT.split(special_request.casefold()):
+                if part.strip():
+                    entries.append((REQUEST_TAG, part.strip()))
+        for tag, keywords in (dietary_keywords or {}).items():
+            entries.extend((tag, kw) for kw in keywords)
+        self.tags = sorted({tag for tag, _ in entries if tag != REQUEST_TAG})
+
+        # Longest phrases first so "100% plant-based" wins over "plant-based"
+        entries.sort(key=lambda e: len(e[1]), reverse=True)
+        patterns = [phrase_pattern(phrase) for _, phrase in entries]
+        singles = [re.compile(p) for p in patterns]
+        # A match also counts for every other keyword it contains
+        self._implied = [
+            frozenset(tag for (tag, _), single in zip(entries, singles) if single.search(phrase))
+            for _, phrase in entries
+        ]
+        self._regex = (
+            re.compile("|".join(f"(?P<g{i}>{p})" for i, p in enumerate(patterns)))
+            if patterns else None
+        )
+
+    def scan(self, texts: list[str]) -> tuple[int, dict[str, int]]:
+        request_hits = 0
+        tag_hits = {}
+        if self._regex is None:
+            return request_hits, tag_hits
+        for text in texts:
+            seen = set()
+            for match in self._regex.finditer(text.casefold()):
+                implied = self._implied[int(match.lastgroup[1:])]
+                if REQUEST_TAG in implied:
+                    request_hits += 1
+                seen.update(implied)
+            seen.discard(REQUEST_TAG)
+            for tag in seen:
+                tag_hits[tag] = tag_hits.get(tag, 0) + 1
+        return request_hits, tag_hits
+
+
+@lru_cache(maxsize=256)
+def _cached_matcher(special_request: str, dietary_items: tuple) -> ReviewMatcher:
+    return ReviewMatcher(special_request, {tag: list(kws) for tag, kws in dietary_items})
+
+
+def get_matcher(special_request: str = None, dietary_keywords: dict[str, list[str]] = None) -> ReviewMatcher:
+    items = tuple((tag, tuple(kws)) for tag, kws in (dietary_keywords or {}).items())
+    return _cached_matcher(special_request or None, items)
@@ -0,0 +1,93 @@
+import time, threading
+from collections import OrderedDict
+
+# Distinct searches (location, type, filters) whose working sets a session keeps
+SESSION_MAX_SEARCHES = 16
+
+
+class WorkingSet:
+    """Every venue one search has already judged: kept venues (enriched) and rejected place_ids.
+
+    Verdicts do not depend on the radius, so a wider search only needs to judge place_ids it has not seen.
+    A venue claimed by one search is in flight until it records or releases it; others wait for it.
+    """
+
+    def __init__(self):
+        self.verdicts = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def claim_new(self, batch: list[dict]) -> tuple[list[dict], list[dict]]:
+        """(venues in `batch` nobody has judged, now claimed by the caller; venues judged or being judged by others)."""
+        fresh, in_flight = [], []
+        with self._lock:
+            for v in batch:
+                place_id = v.get("place_id")
+                if place_id is None:
+                    fresh.append(v)
+                elif place_id in self._pending or place_id in self.verdicts:
+                    in_flight.append(v)
+                else:
+                    self._pending[place_id] = threading.Event()
+                    fresh.append(v)
+        return fresh, in_flight
+
+    def record(self, judged: list[dict], kept: list[dict]) -> None:
+        kept_by_id = {v.get("place_id"): v for v in kept}
+        with self._lock:
+            for v in judged:
+                place_id = v.get("place_id")
+                if place_id is not None:
+                    self.verdicts[place_id] = kept_by_id.get(place_id)
+                    self._settle(place_id)
+
+    def release(self, batch: list[dict]) -> None:
+        """Forget claimed venues whose verdicts cannot be trusted, e.g. from an aborted search."""
+        with self._lock:
+            for v in batch:
+                self._settle(v.get("place_id"))
+
+    def _settle(self, place_id: str) -> None:
+        done = self._pending.pop(place_id, None)
+        if done is not None:
+            done.set()
+
+    def await_verdicts(self, venues: list[dict], timeout: float) -> tuple[list[dict], list[dict]]:
+        """Wait for in-flight venues: (those kept by the search judging them, those it did not settle in time)."""
+        deadline = time.monotonic() + timeout
+        kept, unsettled = [], []
+        for v in venues:
+            with self._lock:
+                done = self._pending.get(v["place_id"])
+            if done is not None:
+                done.wait(max(0.0, deadline - time.monotonic()))
+            with self._lock:
+                if v["place_id"] not in self.verdicts:
+                    unsettled.append(v)
+                elif self.verdicts[v["place_id"]] is not None:
+                    kept.append(self.verdicts[v["place_id"]])
+        return kept, unsettled
+
+
+class SearchSession:
+    """Working sets of one conversation's searches, so a retry with a larger radius reuses what was checked."""
+
+    def __init__(self, max_searches: int = SESSION_MAX_SEARCHES):
+        self.max_searches = max_searches
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def working_set(self, key: tuple) -> WorkingSet:
+        with self._lock:
+            working = self._sets.get(key)
+            if working is None:
+                working = self._sets[key] = WorkingSet()
+                while len(self._sets) > self.max_searches:
+                    self._sets.popitem(last=False)
+            else:
+                self._sets.move_to_end(key)
+            return working
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sets.clear()
@@ -0,0 +1,169 @@
+import os, json, math, time, sqlite3, threading
+from cacheStore import CACHE_DIR
+
+EARTH_RADIUS_M = 6_371_000
+# Grid cell edge in degrees (~5 km north-south), similar to a precision-5 geohash
+CELL_SIZE_DEG = float(os.environ.get("VENUE_INDEX_CELL_DEG", 0.045))
+VENUE_INDEX_MAX_AGE = float(os.environ.get("VENUE_INDEX_MAX_AGE", 86_400))
+# Stale coverage and venues are pruned once every this many writes
+VENUE_INDEX_PRUNE_EVERY = 200
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def _query_key(place_type: str, keyword: str) -> str:
+    return json.dumps([place_type or "", (keyword or "").strip().casefold()])
+
+
+class VenueIndex:
+    """Every venue seen in a nearby search, bucketed into lat/lng grid cells.
+
+    Coverage is tracked per (place type, keyword) and cell: a cell is covered once every page of
+    a search circle containing the whole cell has been read, with the price cap that search used.
+    Coverage and venues older than `max_age` are pruned.
+    """
+
+    def __init__(self, path: str = None, cell_size: float = CELL_SIZE_DEG, max_age: float = VENUE_INDEX_MAX_AGE):
+        self.cell_size = cell_size
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        path = path or os.path.join(CACHE_DIR, "venue_index.sqlite3")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS venues (
+                place_id TEXT PRIMARY KEY, cell TEXT NOT NULL, lat REAL NOT NULL, lng REAL NOT NULL,
+                types TEXT, price_level INTEGER, prominence INTEGER, payload TEXT NOT NULL, seen_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS venues_cell ON venues (cell);
+            CREATE TABLE IF NOT EXISTS matches (
+                query_key TEXT NOT NULL, place_id TEXT NOT NULL, PRIMARY KEY (query_key, place_id));
+            CREATE TABLE IF NOT EXISTS coverage (
+                query_key TEXT NOT NULL, cell TEXT NOT NULL, max_price INTEGER, covered_at REAL NOT NULL,
+                PRIMARY KEY (query_key, cell));
+        """)
+        self._db.commit()
+        self._writes_since_prune = 0
+        self.prune()
+
+    # --- grid ---
+    def cell_of(self, lat: float, lng: float) -> str:
+        return f"{math.floor(lat / self.cell_size)}:{math.floor(lng / self.cell_size)}"
+
+    def cell_center(self, cell: str) -> tuple[float, float]:
+        i, j = (int(x) for x in cell.split(":"))
+        return (i + 0.5) * self.cell_size, (j + 0.5) * self.cell_size
+
+    def cell_radius(self, cell: str) -> int:
+        """Radius of the circle around the cell center that encloses the whole cell."""
+        lat, lng = self.cell_center(cell)
+        half = self.cell_size / 2
+        return math.ceil(haversine_m(lat, lng, lat + half, lng + half))
+
+    def cells_for(self, lat: float, lng: float, radius: float) -> list[str]:
+        """Cells that overlap the circle (by their enclosing circle)."""
+        dlat = math.degrees(radius / EARTH_RADIUS_M)
+        dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        cells = []
+        for i in range(math.floor((lat - dlat) / self.cell_size), math.floor((lat + dlat) / self.cell_size) + 1):
+            for j in range(math.floor((lng - dlng) / self.cell_size), math.floor((lng + dlng) / self.cell_size) + 1):
+                cell = f"{i}:{j}"
+                if haversine_m(lat, lng, *self.cell_center(cell)) - self.cell_radius(cell) <= radius:
+                    cells.append(cell)
+        return cells or [self.cell_of(lat, lng)]
+
+    def cells_inside(self, lat: float, lng: float, radius: float) -> list[str]:
+        """Cells lying entirely inside the circle, the only ones a search of it can vouch for."""
+        return [cell for cell in self.cells_for(lat, lng, radius)
+                if haversine_m(lat, lng, *self.cell_center(cell)) + self.cell_radius(cell) <= radius]
+
+    # --- coverage ---
+    def missing_cells(self, lat: float, lng: float, radius: float,
+                      place_type: str = None, keyword: str = None, max_price: int = None) -> tuple[list[str], list[str]]:
+        """(all cells of the circle, those without a fresh search at this price cap or wider)."""
+        cells = self.cells_for(lat, lng, radius)
+        fresh_after = time.time() - self.max_age
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT cell, max_price FROM coverage WHERE query_key = ? AND covered_at > ? "
+                f"AND cell IN ({','.join('?' * len(cells))})",
+                (_query_key(place_type, keyword), fresh_after, *cells),
+            ).fetchall()
+        covered = {cell for cell, cap in rows if cap is None or (max_price is not None and cap >= max_price)}
+        return cells, [c for c in cells if c not in covered]
+
+    def add(self, results: list[dict], place_type: str = None, keyword: str = None) -> None:
+        """Store one page of results for this query; coverage is only recorded by `cover`."""
+        now = time.time()
+        key = _query_key(place_type, keyword)
+        with self._lock:
+            for r in results:
+                loc = r.get("geometry", {}).get("location")
+                if not loc or not r.get("place_id"):
+                    continue
+                self._db.execute(
+                    "INSERT OR REPLACE INTO venues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (r["place_id"], self.cell_of(loc["lat"], loc["lng"]), loc["lat"], loc["lng"],
+                     json.dumps(r.get("types", [])), r.get("price_level"), r.get("user_ratings_total", 0),
+                     json.dumps(r), now),
+                )
+                self._db.execute("INSERT OR IGNORE INTO matches VALUES (?, ?)", (key, r["place_id"]))
+            self._db.commit()
+        self._wrote()
+
+    def cover(self, lat: float, lng: float, radius: float,
+              place_type: str = None, keyword: str = None, max_price: int = None) -> None:
+        """Mark the cells inside a circle whose search results were read to the last page."""
+        now = time.time()
+        key = _query_key(place_type, keyword)
+        with self._lock:
+            for cell in self.cells_inside(lat, lng, radius):
+                self._db.execute(
+                    "INSERT INTO coverage VALUES (?, ?, ?, ?) ON CONFLICT (query_key, cell) DO UPDATE SET "
+                    "max_price = CASE WHEN coverage.max_price IS NULL OR excluded.max_price IS NULL THEN NULL "
+                    "ELSE MAX(coverage.max_price, excluded.max_price) END, covered_at = excluded.covered_at",
+                    (key, cell, max_price, now),
+                )
+            self._db.commit()
+        self._wrote()
+
+    def _wrote(self) -> None:
+        self._writes_since_prune += 1
+        if self._writes_since_prune >= VENUE_INDEX_PRUNE_EVERY:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop coverage and venues older than `max_age`, and the query matches of dropped venues."""
+        stale = time.time() - self.max_age
+        with self._lock:
+            self._writes_since_prune = 0
+            self._db.execute("DELETE FROM coverage WHERE covered_at <= ?", (stale,))
+            self._db.execute("DELETE FROM venues WHERE seen_at <= ?", (stale,))
+            self._db.execute("DELETE FROM matches WHERE place_id NOT IN (SELECT place_id FROM venues)")
+            self._db.commit()
+
+    def venues_in(self, lat: float, lng: float, radius: float,
+                  place_type: str = None, keyword: str = None, max_price: int = None) -> list[dict]:
+        """Known venues for this query inside the circle, most reviewed first."""
+        cells = self.cells_for(lat, lng, radius + self.cell_size * 111_000)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT v.lat, v.lng, v.price_level, v.payload FROM venues v "
+                f"JOIN matches m ON m.place_id = v.place_id "
+                f"WHERE m.query_key = ? AND v.cell IN ({','.join('?' * len(cells))}) "
+                f"ORDER BY v.prominence DESC, v.place_id",
+                (_query_key(place_type, keyword), *cells),
+            ).fetchall()
+        venues = []
+        for v_lat, v_lng, price_level, payload in rows:
+            if haversine_m(lat, lng, v_lat, v_lng) > radius:
+                continue
+            if max_price is not None and (price_level is None or price_level > max_price):
+                continue
+            venues.append(json.loads(payload))
+        return venues
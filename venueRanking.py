@@ -0,0 +1,98 @@
+import os
+import numpy as np
+from venueIndex import EARTH_RADIUS_M
+
+FEATURES = ("rating", "distance", "price", "requests")
+
+# Relative weight of each feature; override with e.g. EVENTPLANNER_RANKING_WEIGHTS="rating=2,distance=1"
+DEFAULT_WEIGHTS = {"rating": 0.4, "distance": 0.25, "price": 0.15, "requests": 0.2}
+
+# Bayesian rating: a venue starts from PRIOR_RATING as if it had PRIOR_REVIEWS reviews
+PRIOR_RATING = 3.8
+PRIOR_REVIEWS = 50
+
+
+def parse_weights(spec: str) -> dict:
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in (spec or "").split(","):
+        name, _, value = item.partition("=")
+        if name.strip() in FEATURES and value.strip():
+            weights[name.strip()] = float(value)
+    return weights
+
+
+RANKING_WEIGHTS = parse_weights(os.environ.get("EVENTPLANNER_RANKING_WEIGHTS", ""))
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres; any argument may be an array."""
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    dp, dl = p2 - p1, np.radians(np.asarray(lng2) - np.asarray(lng1))
+    a = np.sin(dp / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def feature_matrix(venues: list[dict], lat: float, lng: float, radius: float, price_level: int | None) -> np.ndarray:
+    """(n, 4) matrix of features in [0, 1], columns in FEATURES order; higher is better.
+
+    A `price_level` of None means no budget was given, which makes the price feature the same for every venue.
+    """
+    n = len(venues)
+    raw = np.full((n, 6), np.nan)
+    for i, v in enumerate(venues):
+        loc = (v.get("geometry") or {}).get("location") or {}
+        raw[i] = (v.get("rating", np.nan), v.get("user_ratings_total") or 0, loc.get("lat", np.nan), loc.get("lng", np.nan),
+                  v.get("price_level", np.nan), v.get("request_matches") or 0)
+    rating, reviews, v_lat, v_lng, price, matches = raw.T
+
+    rated = ~np.isnan(rating)
+    bayes = np.where(rated, (PRIOR_RATING * PRIOR_REVIEWS + np.nan_to_num(rating) * reviews) / (PRIOR_REVIEWS + reviews), PRIOR_RATING)
+    distance = haversine_m(lat, lng, v_lat, v_lng)
+    near = np.where(np.isnan(distance), 0.5, 1 - np.clip(distance / max(radius, 1), 0, 1))
+    # Anything the budget covers fits fully and venues without a price level sit halfway; dearer ones lose fit per level
+    if price_level is None:
+        fit = np.full(n, 0.5)
+    else:
+        fit = np.where(np.isnan(price), 0.5, 1 - np.clip(np.nan_to_num(price) - price_level, 0, 4) / 4)
+    # Match counts are the one scale both the live review matcher and the review index produce
+    most = matches.max(initial=0)
+    requested = np.log1p(matches) / np.log1p(most) if most > 0 else np.zeros(n)
+
+    return np.column_stack([bayes / 5, near, fit, requested])
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; ties keep the original order."""
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=int)
+    candidates = np.arange(n) if k == n else np.argpartition(-scores, k - 1)[:k]
+    # argpartition breaks ties at the boundary arbitrarily; prefer the earlier venue
+    if k < n:
+        cutoff = scores[candidates].min()
+        candidates = np.concatenate([np.flatnonzero(scores > cutoff), np.flatnonzero(scores == cutoff)])[:k]
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def rank_venues(venues: list[dict],
+                lat: float,
+                lng: float,
+                radius: float,
+                price_level: int | None,
+                k: int = None,
+                weights: dict = None) -> list[dict]:
+    """The best `k` venues by a weighted sum of the features; each gets a `ranking_score`."""
+    if not venues:
+        return []
+    weights = weights or RANKING_WEIGHTS
+    w = np.array([weights.get(name, 0.0) for name in FEATURES])
+    if w.sum() > 0:
+        w = w / w.sum()
+    scores = feature_matrix(venues, lat, lng, radius, price_level) @ w
+    order = top_k(scores, len(venues) if k is None else k)
+    ranked = []
+    for i in order:
+        venues[i]["ranking_score"] = round(float(scores[i]), 4)
+        ranked.append(venues[i])
+    return ranked
@@ -0,0 +1,198 @@
+import os, re, json
+from helperFunctions import geocode_address, search_venues, budget_to_price_level, next_budget_tier
+from mapsBackend import CallBudget, CallBudgetExceeded, call_budget
+
+PREFERENCE_KEYS = ("event_type", "participants", "budget_per_person", "event_time", "location", "special_requests")
+DEFAULT_RADIUS = 10_000
+DEFAULT_MAX_RESULTS = 5
+
+# Set EVENTPLANNER_DIRECT_SEARCH=0 to go back to LLM-generated search code run by the executor
+DIRECT_SEARCH = os.environ.get("EVENTPLANNER_DIRECT_SEARCH", "1") != "0"
+
+NO_VENUES_MESSAGE = """No venues found with the current preferences. Let me offer some alternatives.
+
+Would you like me to try one of these options?
+1. Search in a larger area
+2. Search in a different nearby location
+3. Increase your budget range
+4. Remove special requests
+5. Try a different event type
+
+Please tell me which option you'd prefer (1-5)."""
+
+# Set EVENTPLANNER_AUTO_RELAX=1 to relax an empty or short search in place instead of asking the user
+AUTO_RELAX = os.environ.get("EVENTPLANNER_AUTO_RELAX", "0") != "0"
+RELAXATION_RUNGS = ("expand_radius", "increase_budget", "remove_time", "remove_requests")
+# Comma-separated rungs, tried in order and kept once applied
+RELAX_LADDER = tuple(rung for rung in (r.strip() for r in os.environ.get("EVENTPLANNER_RELAX_LADDER", ",".join(RELAXATION_RUNGS)).split(","))
+                     if rung in RELAXATION_RUNGS)
+# Maps calls the relaxed searches may spend together
+RELAX_MAX_CALLS = int(os.environ.get("EVENTPLANNER_RELAX_MAX_CALLS", 80))
+
+_FLAT_JSON = re.compile(r"\{[^{}]*\}")
+_BARE_NONE = re.compile(r"(:\s*)None\b")
+
+
+def parse_json_objects(content: str) -> list[dict]:
+    """Flat JSON objects embedded in an agent message, tolerating Python-style None."""
+    objects = []
+    for raw in _FLAT_JSON.findall(content or ""):
+        try:
+            obj = json.loads(_BARE_NONE.sub(r"\1null", raw))
+        except json.JSONDecodeError:
+            continue
+        if isinstance(obj, dict):
+            objects.append(obj)
+    return objects
+
+
+def parse_venue_list(content: str) -> list[dict] | None:
+    """Venues from a search turn: bare JSON from Venue_Search_Agent or executor output ending in a JSON list."""
+    text = (content or "").strip()
+    if "exitcode:" in text and "Code output:" in text:
+        text = text.split("Code output:", 1)[1].strip()
+    if not (text.startswith("[") and text.endswith("]")):
+        return None
+    try:
+        venues = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(venues, list) and venues and all(isinstance(v, dict) and "name" in v for v in venues):
+        return venues
+    return None
+
+
+def apply_fallback(prefs: dict, fallback: dict) -> dict:
+    prefs = dict(prefs)
+    kind = fallback.get("fallback")
+    if kind == "expand_radius":
+        prefs["radius"] = fallback.get("new_radius") or prefs.get("radius", DEFAULT_RADIUS) * 2
+    elif kind == "change_location":
+        prefs["location"] = fallback.get("new_location", prefs.get("location"))
+    elif kind == "increase_budget":
+        prefs["budget_per_person"] = fallback.get("new_budget_per_person", prefs.get("budget_per_person"))
+    elif kind == "remove_requests":
+        prefs["special_requests"] = None
+    elif kind == "change_event_type":
+        prefs["event_type"] = fallback.get("new_event_type", prefs.get("event_type"))
+    elif kind == "change_event_time":
+        prefs["event_time"] = fallback.get("new_event_time")
+    return prefs
+
+
+def effective_preferences(prefs: dict, fallbacks: list[dict] = ()) -> dict:
+    for fallback in fallbacks:
+        prefs = apply_fallback(prefs, fallback)
+    return prefs
+
+
+def search_signature(prefs: dict) -> tuple:
+    """What makes two searches return the same venues; budgets compare by the price level they map to."""
+    requests = prefs.get("special_requests")
+    return (
+        " ".join(str(prefs.get("location") or "").lower().split()),
+        prefs.get("event_type"),
+        int(prefs.get("radius") or DEFAULT_RADIUS),
+        budget_to_price_level(float(prefs.get("budget_per_person") or 1000)),
+        " ".join(requests.lower().split()) if isinstance(requests, str) and requests.strip() else None,
+        prefs.get("event_time"),
+        int(prefs.get("max_results") or DEFAULT_MAX_RESULTS),
+    )
+
+
+def run_structured_search(prefs: dict, fallbacks: list[dict] = (), session=None) -> list[dict]:
+    """Venue search straight from the collected preference (and fallback) JSON, in-process.
+
+    Pass the conversation's `SearchSession` so fallback retries reuse the venues already checked.
+    """
+    prefs = effective_preferences(prefs, fallbacks)
+    lat, lng = geocode_address(prefs.get("location"))
+    event_type = prefs.get("event_type")
+    return search_venues(
+        lat=lat, lng=lng,
+        radius=int(prefs.get("radius") or DEFAULT_RADIUS),
+        place_type=event_type,
+        keyword=event_type,
+        budget_per_person=float(prefs.get("budget_per_person") or 1000),
+        special_request=prefs.get("special_requests"),
+        event_time=prefs.get("event_time"),
+        max_results=int(prefs.get("max_results") or DEFAULT_MAX_RESULTS),
+        session=session,
+    )
+
+
+def relaxation_step(prefs: dict, rung: str) -> tuple[dict, str] | None:
+    """Fallback JSON for one rung of the ladder and a description of it, or None where it does not apply."""
+    if rung == "expand_radius":
+        radius = int(prefs.get("radius") or DEFAULT_RADIUS) * 2
+        return {"fallback": "expand_radius", "new_radius": radius}, f"widened the search to {radius / 1000:g} km"
+    if rung == "increase_budget":
+        budget = next_budget_tier(float(prefs.get("budget_per_person") or 1000))
+        if budget is None:
+            return None
+        return {"fallback": "increase_budget", "new_budget_per_person": budget}, f"raised the budget to €{budget:g} per person"
+    if rung == "remove_time" and prefs.get("event_time"):
+        return {"fallback": "change_event_time", "new_event_time": None}, "included venues that may be closed at the event time"
+    if rung == "remove_requests" and prefs.get("special_requests"):
+        return {"fallback": "remove_requests"}, f"dropped the special request \"{prefs['special_requests']}\""
+    return None
+
+
+def search_with_relaxation(prefs: dict,
+                           fallbacks: list[dict] = (),
+                           session=None,
+                           ladder: tuple = RELAX_LADDER,
+                           max_calls: int = RELAX_MAX_CALLS) -> tuple[list[dict], list[str]]:
+    """Search, and while fewer than `max_results` venues turn up, relax the search one rung at a time.
+
+    Rungs accumulate. Venues the stricter searches found come first; the rest carry `relaxed_by`.
+    The relaxed searches share one call budget; a rung it cuts short, or that fails, is discarded
+    and ends the ladder.
+    Returns the venues and the relaxations that were applied.
+    """
+    max_results = int(effective_preferences(prefs, fallbacks).get("max_results") or DEFAULT_MAX_RESULTS)
+    venues = list(run_structured_search(prefs, fallbacks, session=session))
+    seen = {v.get("place_id") for v in venues}
+    chain, applied = list(fallbacks), []
+    rungs = iter(ladder)
+    budget = CallBudget(max_calls)
+    with call_budget(budget):
+        while len(venues) < max_results:
+            step = None
+            for rung in rungs:
+                step = relaxation_step(effective_preferences(prefs, chain), rung)
+                if step is not None:
+                    break
+            if step is None:
+                break
+            try:
+                found = run_structured_search(prefs, [*chain, step[0]], session=session)
+            except CallBudgetExceeded:
+                break
+            except Exception as e:
+                # Keep what the stricter searches found rather than losing it to one failed rung
+                print(f"Relaxed search ({step[1]}) failed: {e}")
+                break
+            if budget.exhausted:
+                break
+            chain.append(step[0])
+            applied.append(step[1])
+            for v in found:
+                if v.get("place_id") not in seen:
+                    seen.add(v.get("place_id"))
+                    venues.append(dict(v, relaxed_by=list(applied)))
+    return venues[:max_results], applied
+
+
+def collect_preferences(messages: list[dict], skip_names: tuple = ()) -> tuple[dict, list[dict]]:
+    """Latest value of every preference plus all fallback modifications, in order."""
+    prefs, fallbacks = {}, []
+    for msg in messages:
+        if msg.get("name") in skip_names or not isinstance(msg.get("content"), str):
+            continue
+        for obj in parse_json_objects(msg["content"]):
+            if "fallback" in obj:
+                fallbacks.append(obj)
+            else:
+                prefs.update({k: v for k, v in obj.items() if k in PREFERENCE_KEYS})
+    return prefs, fallbacks
@@ -0,0 +1,111 @@
+import folium
+import streamlit as st
+from streamlit_folium import folium_static
+
+# Place types that say nothing about the venue itself
+GENERIC_TYPES = {"point_of_interest", "establishment", "food", "store"}
+
+
+def create_venue_map(venues):
+    if not venues:
+        return
+    center_lat, center_lng = None, None
+    for venue in venues:
+        if "geometry" in venue and "location" in venue["geometry"]:
+            center_lat = venue["geometry"]["location"]["lat"]
+            center_lng = venue["geometry"]["location"]["lng"]
+            break
+    if center_lat is None or center_lng is None:
+        st.error("No valid venue coordinates found")
+        return
+    m = folium.Map(location=[center_lat, center_lng], zoom_start=13)
+    for venue in venues:
+        if "geometry" not in venue or "location" not in venue["geometry"]:
+            continue
+        lat = venue["geometry"]["location"]["lat"]
+        lng = venue["geometry"]["location"]["lng"]
+        name = venue["name"]
+        address = venue.get("vicinity", "Address not available")
+        rating = venue.get("rating", "No rating")
+        place_id = venue.get("place_id", "")
+        if place_id:
+            google_maps_url = f"https://www.google.com/maps/place/?q=place_id:{place_id}"
+        else:
+            google_maps_url = f"https://www.google.com/maps/search/?api=1&query={lat},{lng}"
+        popup_html = f"""
+        <div style="width:200px;border-radius:25px;">
+            <h4>{name}</h4>
+            <p><b>Address:</b> {address}</p>
+            <p><b>Rating:</b> {rating}/5</p>
+            <p><a href="{google_maps_url}" target="_blank">View on Google Maps</a></p>
+        </div>
+        """
+        tooltip_html = f"<div style='width:100%;font-size:16px'><strong>{name}</strong>"
+        folium.Marker(
+            location=[lat, lng],
+            tooltip=tooltip_html,
+            popup=folium.Popup(popup_html, max_width=300),
+            icon=folium.Icon(color='red')
+        ).add_to(m)
+    if len(venues) > 1:
+        coordinates = []
+        for venue in venues:
+            if "geometry" in venue and "location" in venue["geometry"]:
+                lat = venue["geometry"]["location"]["lat"]
+                lng = venue["geometry"]["location"]["lng"]
+                coordinates.append([lat, lng])
+        if coordinates:
+            m.fit_bounds(coordinates)
+    folium_static(m, width=700, height=500)
+
+
+
+def maps_url(venue: dict) -> str:
+    place_id = venue.get("place_id")
+    if place_id:
+        return f"https://www.google.com/maps/place/?q=place_id:{place_id}"
+    location = venue.get("geometry", {}).get("location", {})
+    return f"https://www.google.com/maps/search/?api=1&query={location.get('lat')},{location.get('lng')}"
+
+
+def describe_venue(venue: dict) -> str:
+    facts = []
+    kind = next((t for t in venue.get("types", []) if t not in GENERIC_TYPES), None)
+    if kind:
+        facts.append(kind.replace("_", " ").capitalize())
+    if venue.get("price_level") is not None:
+        facts.append("€" * max(int(venue["price_level"]), 1))
+    if venue.get("user_ratings_total"):
+        facts.append(f"{venue['user_ratings_total']:,} reviews")
+    sentences = [" · ".join(facts)] if facts else []
+
+    if venue.get("request_matches"):
+        count = venue["request_matches"]
+        sentences.append(f"{count} recent review{'s' if count != 1 else ''} match your special request")
+    dietary = [k.replace("_", "-") for k, n in sorted((venue.get("dietary_matches") or {}).items(),
+                                                      key=lambda kv: -kv[1]) if n][:3]
+    if dietary:
+        options = dietary[0] if len(dietary) == 1 else ", ".join(dietary[:-1]) + f" and {dietary[-1]}"
+        sentences.append(f"Reviewers mention {options} options")
+    if venue.get("business_status") not in (None, "OPERATIONAL"):
+        sentences.append(f"Listed as {venue['business_status'].replace('_', ' ').lower()}")
+    return ". ".join(sentences) + "." if sentences else "No further details available."
+
+
+def render_venue_recommendations(venues: list[dict], limit: int = 5) -> str:
+    """The recommendation markdown Event_Recommendation_Agent is prompted to write, straight from the venue dicts."""
+    blocks = []
+    relaxations = max((venue.get("relaxed_by") or [] for venue in venues[:limit]), key=len, default=[])
+    if relaxations:
+        blocks.append(f"_Too few venues matched everything, so I {', then '.join(relaxations)}._")
+    for i, venue in enumerate(venues[:limit], start=1):
+        rating = venue.get("rating")
+        rating_text = f"{rating}/5" if rating is not None else "No rating"
+        blocks.append(
+            f"- ### {i}. {venue.get('name', 'Unnamed venue')}:\n"
+            f"    **Address:** {venue.get('vicinity') or venue.get('formatted_address') or 'Address not available'}  \n"
+            f"    **Rating:** {rating_text}  \n"
+            f"    **Description:** {describe_venue(venue)}  \n"
+            f"    [View on Google Maps]({maps_url(venue)})"
+        )
+    return "\n\n".join(blocks)
@@ -0,0 +1,230 @@
+import os, io, sys, runpy, queue, atexit, threading, traceback, importlib
+import multiprocessing as mp
+import multiprocessing.forkserver
+from contextlib import redirect_stdout, redirect_stderr
+from hashlib import md5
+from autogen.code_utils import PYTHON_VARIANTS, TIMEOUT_MSG
+from autogen.coding import LocalCommandLineCodeExecutor, CodeBlock
+from autogen.coding.base import CommandLineCodeResult
+from autogen.coding.local_commandline_code_executor import _get_file_name_from_content
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules every worker has imported before it takes its first job
+PRELOAD_MODULES = ("helperFunctions",)
+# Environment changes that invalidate the worker's cached Maps client
+_CLIENT_ENV = ("RUNTIME_GOOGLEMAPS_API_KEY", "MAPS_BACKEND", "MAPS_FIXTURES")
+
+WARM_POOL_SIZE = int(os.environ.get("WARM_POOL_SIZE", 2))
+WARM_MAX_JOBS = int(os.environ.get("WARM_MAX_JOBS", 50))
+WARM_MAX_RSS_MB = int(os.environ.get("WARM_MAX_RSS_MB", 1024))
+
+
+def _rss_mb() -> float:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        return 0.0
+
+
+def _in_child_process() -> bool:
+    # Workers and children still importing __main__ must never start a pool of their own
+    return mp.parent_process() is not None or getattr(mp.current_process(), "_inheriting", False)
+
+
+def _worker_main(conn, preload: tuple) -> None:
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    for name in preload:
+        importlib.import_module(name)
+    try:
+        # Build the Maps client up front when a key is already available
+        sys.modules["helperFunctions"].get_gmaps()
+    except Exception:
+        pass
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        path, cwd, env = job
+        if any(os.environ.get(k) != env.get(k) for k in _CLIENT_ENV) and "helperFunctions" in sys.modules:
+            sys.modules["helperFunctions"]._GMAPS = None
+        os.environ.clear()
+        os.environ.update(env)
+        os.chdir(cwd)
+
+        out, err = io.StringIO(), io.StringIO()
+        exitcode = 0
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                runpy.run_path(path, run_name="__main__")
+            except SystemExit as e:
+                exitcode = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except BaseException:
+                traceback.print_exc()
+                exitcode = 1
+        conn.send((exitcode, err.getvalue() + out.getvalue(), _rss_mb()))
+
+
+class _Worker:
+    def __init__(self, ctx, preload: tuple):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WarmWorkerPool:
+    """Long-lived Python workers with the heavy modules already imported.
+
+    Scripts are dispatched over a pipe. A job that exceeds its timeout kills its worker, a crashed
+    worker is replaced, and workers are recycled after `max_jobs` jobs or once their peak RSS
+    passes `max_rss_mb`.
+    """
+
+    def __init__(self, size: int = WARM_POOL_SIZE, max_jobs: int = WARM_MAX_JOBS,
+                 max_rss_mb: int = WARM_MAX_RSS_MB, preload: tuple = PRELOAD_MODULES):
+        self.size = size
+        self.max_jobs = max_jobs
+        self.max_rss_mb = max_rss_mb
+        self.preload = preload
+        self._forkserver = "forkserver" in mp.get_all_start_methods()
+        self._ctx = mp.get_context("forkserver" if self._forkserver else "spawn")
+        if self._forkserver:
+            # New workers fork from a server that already imported this module and the heavy ones
+            self._ctx.set_forkserver_preload([__name__, *preload])
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _start_forkserver(self) -> None:
+        # The fork server ignores the parent's sys.path, so preloading only finds our modules via PYTHONPATH
+        previous = os.environ.get("PYTHONPATH")
+        os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT_DIR, previous]))
+        try:
+            mp.forkserver.ensure_running()
+        finally:
+            if previous is None:
+                os.environ.pop("PYTHONPATH")
+            else:
+                os.environ["PYTHONPATH"] = previous
+
+    def _ensure_started(self) -> None:
+        if _in_child_process():
+            raise RuntimeError("The warm worker pool cannot start inside a child process")
+        with self._lock:
+            if not self._started:
+                if self._forkserver:
+                    self._start_forkserver()
+                for _ in range(self.size):
+                    self._idle.put(_Worker(self._ctx, self.preload))
+                self._started = True
+
+    def warm_up(self) -> None:
+        # Workers import in the background, so the first generated script doesn't pay for it
+        if _in_child_process():
+            return
+        self._ensure_started()
+
+    def run(self, path: str, cwd: str, timeout: float) -> tuple[int, str]:
+        self._ensure_started()
+        worker = self._idle.get()
+        try:
+            worker.conn.send((path, cwd, dict(os.environ)))
+            if not worker.conn.poll(timeout):
+                worker.process.kill()
+                worker.process.join()
+                worker = _Worker(self._ctx, self.preload)
+                return 124, TIMEOUT_MSG
+            try:
+                exitcode, output, rss_mb = worker.conn.recv()
+            except (EOFError, OSError):
+                worker.process.join()
+                code = worker.process.exitcode
+                worker = _Worker(self._ctx, self.preload)
+                return 1, f"Worker process crashed (exit code {code})"
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs or rss_mb >= self.max_rss_mb:
+                worker.stop()
+                worker = _Worker(self._ctx, self.preload)
+            return exitcode, output
+        finally:
+            self._idle.put(worker)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            while not self._idle.empty():
+                self._idle.get_nowait().stop()
+            self._started = False
+
+
+_POOL = None
+def get_worker_pool() -> WarmWorkerPool:
+    # One pool per server process, shared by every Streamlit session
+    global _POOL
+    if _POOL is None:
+        _POOL = WarmWorkerPool()
+        atexit.register(_POOL.shutdown)
+    return _POOL
+
+
+class WarmCommandLineCodeExecutor(LocalCommandLineCodeExecutor):
+    """LocalCommandLineCodeExecutor that runs Python blocks on the warm worker pool instead of a new interpreter."""
+
+    def __init__(self, *args, pool: WarmWorkerPool = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The shared pool is only created and started by the first Python block executed
+        self._pool = pool
+
+    @property
+    def pool(self) -> WarmWorkerPool:
+        return self._pool or get_worker_pool()
+
+    def _execute_code_dont_check_setup(self, code_blocks: list[CodeBlock]) -> CommandLineCodeResult:
+        if any(block.language.lower() not in PYTHON_VARIANTS for block in code_blocks):
+            return super()._execute_code_dont_check_setup(code_blocks)
+
+        logs_all = ""
+        exitcode = 0
+        file_names = []
+        for block in code_blocks:
+            LocalCommandLineCodeExecutor.sanitize_command("python", block.code)
+            try:
+                filename = _get_file_name_from_content(block.code, self._work_dir)
+            except ValueError:
+                return CommandLineCodeResult(exit_code=1, output="Filename is not in the workspace")
+            if filename is None:
+                filename = f"tmp_code_{md5(block.code.encode()).hexdigest()}.py"
+            written_file = (self._work_dir / filename).resolve()
+            written_file.write_text(block.code, encoding="utf-8")
+            file_names.append(written_file)
+
+            exitcode, output = self.pool.run(str(written_file), str(self._work_dir.resolve()), float(self._timeout))
+            logs_all += output
+            if exitcode != 0:
+                break
+
+        code_file = str(file_names[0]) if file_names else None
+        return CommandLineCodeResult(exit_code=exitcode, output=logs_all, code_file=code_file)
+
+    def restart(self) -> None:
+        self.pool.shutdown()